@@ -1,233 +1,92 @@
 # app.py
+# Démarrage à froid : seuls streamlit et les modules légers sont importés ici. pandas,
+# yfinance, openpyxl (et le moteur de téléchargement) ne sont chargés qu'au premier
+# calcul. Mesure : python benchmarks/startup.py
+import logging
+import os
+import time
+_debut_script = time.perf_counter()
+
 import streamlit as st
-import yfinance as yf
-from datetime import datetime, timedelta
-import pandas as pd
-import matplotlib.pyplot as plt
-import re 
+from engine import MODES, build_underlying, compute_basket, is_rule
+from fx import REPORTING_CURRENCIES
+from metrics import METRICS, start_http_server
+from tickers import suggest_tickers
 
 st.set_page_config(page_title="Spot Calculator", layout="wide")
 
 # ---------- Utilitaires ----------
-# ... (Fonctions get_price_on_date, safe_float_list, is_valid_ticker, resolve_ticker_from_name restent inchangées)
-
-def get_price_on_date(ticker, date_str):
-    """Retourne le prix Close le plus proche de date_str (format JJ/MM/AAAA)"""
-    try:
-        date = datetime.strptime(date_str.strip(), "%d/%m/%Y")
-    except Exception:
-        return None
-    start = date - timedelta(days=4)
-    end = date + timedelta(days=4)
-    try:
-        data = yf.download(ticker.upper(), start=start, end=end, progress=False)
-    except Exception:
-        return None
-    if data is None or data.empty:
-        return None
-    if data.index.tz is not None:
-        data.index = data.index.tz_localize(None)
-    data["diff"] = abs(data.index - date)
-    closest = data.sort_values("diff").iloc[0]
-    return float(closest["Close"])
+# ... (récupération des prix : providers.py ; résolution des tickers : tickers.py)
 
 def safe_float_list(lst):
     return [None if v is None else float(v) for v in lst]
 
-def is_valid_ticker(ticker):
-    """Vérifie rapidement si un ticker est reconnu par yfinance."""
-    if not ticker: return False
-    try:
-        info = yf.Ticker(ticker).info
-        if 'longName' in info and len(info.get('longName', '')) > 2:
-            return True
-        return False
-    except Exception:
-        return False
-
-def resolve_ticker_from_name(name_or_ticker):
+@st.cache_resource
+def get_provider(offline):
+    """Fournisseur de cours partagé par les sessions (cache SQLite local)."""
+    from providers import make_provider  # Import différé (pandas, yfinance)
+    return make_provider(offline=offline)
+
+@st.cache_resource
+def start_metrics_endpoint(port):
     """
-    Tente de trouver le ticker Yahoo Finance en utilisant d'abord un mappage 
-    pour les noms courants, puis la vérification directe (pour les tickers inconnus).
+    Expose /metrics (Prometheus) et /metrics.json une seule fois par processus.
+    Streamlit n'exécute ce script qu'à l'ouverture d'une session : l'endpoint n'apparaît
+    donc qu'après la première session, pas dès le lancement du serveur. Si le port est
+    déjà pris, un avertissement est journalisé une seule fois (None est mis en cache).
     """
-    clean_input = name_or_ticker.strip().upper()
-    
-    # --- 1. Mappage Direct des noms courants (Liste Blanche) ---
-    COMMON_TICKERS = {
-        "APPLE": "AAPL", "MICROSOFT": "MSFT", "GOOGLE": "GOOGL", "ALPHABET": "GOOGL",
-        "AMAZON": "AMZN","META": "META","BERKSHIRE HATHAWAY": "BRK-A","JOHNSON & JOHNSON": "JNJ",
-        "JPMORGAN CHASE": "JPM", "EXXON MOBIL": "XOM", "COCA-COLA": "KO",
-        "WALMART": "WMT", "DISNEY": "DIS", "LVMH": "LVMH.PA", "LOREAL": "OR.PA",
-        "TOTALENERGIES": "TTE", "SANTE": "SAN.PA", "BNP PARIBAS": "BNP.PA",
-        "BNP": "BNP.PA", "SOCIETE GENERALE": "GLE.PA", "HERMES": "RMS.PA",
-        "AIRBUS": "AIR.PA", "AXA": "CS.PA", "SAP": "SAP.DE", "SIEMENS": "SIE.DE",
-        "BAYER": "BAYN.DE", "SAMSUNG": "005930.KS", "TSMC": "TSM","TOYOTA": "TM",
-        "JPMORGAN CHASE": "JPM","BANK OF AMERICA": "BAC",
-        "WELLS FARGO & CO": "WFC","GOLDMAN SACHS": "GS","MORGAN STANLEY": "MS",
-        "CITIGROUP INC": "C","CITIGROUP": "C","CITI" : "C","BNP PARIBAS": "BNP.PA",
-        "CREDIT AGRICOLE": "ACA.PA","DEUTSCHE BANK AG": "DBK.DE","COMMERZBANK AG": "CBK.DE",
-        "UBS GROUP AG": "UBSG.SW","UBS GROUP" : "UBSG.SW","UBS": "UBSG.SW",
-        "STANDARD CHARTERED": "STAN.L","BARCLAYS PLC": "BARC.L","LLOYDS BANKING GROUP": "LLOY.L",
-        "NATWEST GROUP": "NWG.L","ROYAL BANK OF CANADA": "RY","TORONTO-DOMINION BANK": "TD",
-        "SOCIETE GENERALE": "GLE.PA","HSBC": "HSBA.L",
-  # --- BANQUES RÉGIONALES ET SPÉCIALISÉES (US & EU) ---
-        "PNC FINANCIAL SERV": "PNC","US BANCORP": "USB","CAPITAL ONE FINANCIAL": "COF",
-        "ZIONS BANCORP": "ZION","COMERICA INC": "CMA","HUNTINGTON BANCSHARES": "HBAN",
-        "REGIONS FINANCIAL CORP": "RF","FIFTH THIRD BANCORP": "FITB","KEYCORP": "KEY",
-        "EAST WEST BANCORP": "EWBC","ING GROEP NV": "INGA.AS","KBC GROUP NV": "KBC.BR",
-        "BANCO SANTANDER": "SAN","UNICREDIT SPA": "UCG.MI",
-        "INTESA SANPAOLO": "ISP.MI","BANCO DE SABADELL": "SAB.MC","CAIXABANK SA": "CABK.MC",
-        "MEDIOBANCA SPA": "MB.MI","NORDEA BANK ABP": "NDA-DK.CO",
-        "DANSKE BANK A/S": "DANSKE.CO","SWEDBANK AB": "SWED A.ST","SEB AB": "SEB A.ST",
- # --- ASSURANCES (VIE, NON-VIE, RÉASSURANCE) ---
-        "CHUBB LTD": "CB","AIG": "AIG","METLIFE INC": "MET","PRUDENTIAL FINANCIAL": "PRU",
-        "UNUM GROUP": "UNM","TRUIST FINANCIAL CORP": "TFC","ALLIANZ SE": "ALV.DE",
-        "MUNICH RE": "MUV2.DE","HANNOVER RE": "HNR1.DE","ZURICH INSURANCE GR": "ZURN.SW",
-        "GENERALI ASSICURAZIONI": "G.MI","AVIVA PLC": "AV.L","LEGAL & GENERAL GR": "LGEN.L",
-        "PRUDENTIAL PLC (UK)": "PRU.L","MANULIFE FINANCIAL": "MFC","SUN LIFE FINANCIAL": "SLF",
-        "AXA SA": "CS.PA",
- # --- GESTION D'ACTIFS ET MARCHÉS DE CAPITAUX ---
-       "BLACKROCK INC": "BLK","VANGUARD": "VTI","STATE STREET CORP": "STT","CME GROUP": "CME",
-       "BANK OF NEW YORK MELLON": "BK","NORTHERN TRUST CORP": "NTRS","CME GROUP": "CME",
-       "INTERCONTINENTAL EXC": "ICE","CBOE GLOBAL MARKETS": "CBOE","NASDAQ INC": "NDAQ",
-       "LSE GROUP PLC": "LSEG.L","DEUTSCHE BOERSE AG": "DB1.DE","EURONEXT NV": "ENX.PA",
-       "HONG KONG EXCHANGES": "0388.HK","S&P GLOBAL INC": "SPGI","MOODY'S CORP": "MCO",
-       "FACTSET RESEARCH": "FDS",
- # --- FINTECH ET PAIEMENTS ---
-       "VISA INC": "V","MASTERCARD INC": "MA","AMERICAN EXPRESS": "AXP", "FIS GLOBAL": "FIS",
-       "PAYPAL HOLDINGS": "PYPL","SQUARE (BLOCK INC)": "SQ","COINBASE GLOBAL": "COIN",
-       "ADYEN NV": "ADYEN.AS","GLOBAL PAYMENTS INC": "GPN","FISERV INC": "FISV",
-       "FIS GLOBAL": "FIS","DISCOVER FINANCIAL SERV": "DFS","SYNCHRONY FINANCIAL": "SYF",
-       "AFFIRM HOLDINGS": "AFRM","SOFI TECHNOLOGIES": "SOFI","ROBINHOOD MARKETS": "HOOD",
-       "WISE PLC": "WISE.L","PAGSEGURO DIGITAL": "PAGS","STONECO LTD": "STNE", 
-# -- BANQUES ASIATIQUES ET ÉMERGENTES --
-       "MITSUBISHI UFJ FIN": "8306.T","SUMITOMO MITSUI FIN": "8316.T","MIZUHO FINANCIAL GR": "8411.T",
-       "NOMURA HOLDINGS": "8604.T","HDFC BANK": "HDFCBANK.NS","ICICI BANK": "ICICIBANK.NS",
-       "AXIS BANK": "AXISBANK.NS","STATE BANK OF INDIA": "SBIN.NS","BANK OF CHINA": "3988.HK",
-       "CHINA CONSTRUCTION BK": "0939.HK","ICBC": "1398.HK","WESTPAC BANKING CORP": "WBC.AX",
-       "ANZ GROUP HOLDINGS": "ANZ.AX","COMMONWEALTH BANK AUS": "CBA.AX","MACQUARIE GROUP": "MQG.AX",
-       "DBS GROUP HOLDINGS": "DBSM.SI","OVERSEAS CHINESE BK": "OCBC.SI",
-# -- BOITES IA ET TECH --
-       "ARISTANETWORKS": "ANET","ACLARARES": "ACLA","ALPHA&OMEGASEMI": "AOSL","MONOLITHICPOWERSYS": "MPWR",
-       "QORVOINC": "QRVO","LUMINARTECH": "LAZR","AMD": "AMD","GLOBO": "GLBE","AXCELISTECHNOLOGIES": "ACLS",
-       "NOVARTUS": "NVTS","SILICONLABS": "SLAB","HIMAXTECHNOLOGIES": "HIMX","INPHICORPORATION": "IPHI",
-       "ONSEMICONDUCTOR": "ON","MACOMTECHNOLOGY": "MTSI","MKSINSTRUMENTS": "MKSI","ULVAC": "6728.T",
-       "OKTAINC": "OKTA","DATADOG": "DDOG","COUPASOFTWARE": "COUP","C3AI": "AI","UPSTARTHOLDINGS": "UPST",
-       "VEEVASYSTEMS": "VEEV","ZENDESK": "ZEN","NEWRELIC": "NEWR","MULESOFT": "MULE","ASANA": "ASAN",
-       "PALANTIRTECHNOLOGIES": "PLTR","DRAFTKINGS": "DKNG","CROWDSTRIKEHOLDINGS": "CRWD","ZSCALER": "ZS",
-       "FORTINET": "FTNT","CHECKPOINTSOFTWARE": "CHKP","CYBERARKSOFTWARE": "CYBR","PROOFPOINT": "PFPT",
-       "OKTA": "OKTA","ACTEURSASIATIQUES&EUROPÉENS": "","NORDICSEMICONDUCTOR": "NOD.OL","IMEC": "IMEC.BR",
-       "ACCELERATED": "ACEL","INFINEONTECHNOLOGIES": "IFX.DE","STMICROELECTRONICS": "STM","JD.COM": "JD",
-       "ASMLHOLDING": "ASML","MEITUAN": "3690.HK","JD.COM": "JD","BAIDUINC": "BIDU","NETEASEINC": "NTES",
-       "SKHYNIX": "000660.KS","KINGSOFTCLOUD": "KC","SONYGROUPCORP": "SONY","CANONINC": "CAJ","REDHAT": "IBM",
-       "ARCELIKAS": "ARCLK.IS","INVITAECORP": "NVTA","TAIYOYUDENCO": "6976.T","TOKYOELECTRONLTD": "8035.T",
-       "SCREENHOLDINGSCO": "7735.T","BESEMICONDUCTOR": "BESI.AS","EVOTECSE": "EVT.DE","BIONTECHSE": "BNTX",
-       "TELADOCHEALTH": "TDOC","MAXLINEARINC": "MXL","WIX.COMLTD": "WIX","RINGCENTRAL": "RNG",
-       "PAYCOMSOFTWARE": "PAYC","DOCUSIGNINC": "DOCU","TERADATACORP": "TDC","DATTOHOLDINGCORP": "DATTO",
-       "CHECKPOINTSOFT": "CHKP","PALOALTONETWORKS": "PANW","ASANAINC": "ASAN","FASTLYINC": "FSLY",
-       "LATTICESEMICON": "LSCC","DURATIONMEDIA": "DUR","ROHMCOLTD": "6963.T","DISCOCORP": "6146.T",
-       "PHOTRONLTD": "6899.T","AMS-OSRAMAG": "AMS.SW","SARTORIUSSTEDIM": "DIM.PA","CUREVACNV": "CVAC",
-       "ACCELERATEDIAGNOSTICS": "AXDX","SAGEGROUPPLC": "SGE.L","HUBSPOTINC": "HUBS","CLOUDERA": "CLDR",
-       "FIVERRINTERNATIONAL": "FVRR","AUTOMATICDATAPROC": "ADP","HEWLETTPACKARDENT": "HPE",
-       "COUPASOFTWARE": "COUP","DXCTECHNOLOGY": "DXC","CYBERARKSOFTWARE": "CYBR","ZSCALERINC": "ZS",
-       "C3.AIINC": "AI","CORTICELLIB": "CORB","CREEINC": "CREE","AMBARELLAINC": "AMBA","SUMCOCORP": "3436.T",
-       "LASERTECCORP": "6920.T","ASMINTERNATIONAL": "ASM.AS","AIXTRONSE": "AIXA.DE","GENMABAS": "GMAB.CO",
-       "VAXARTINC": "VXRT","INSIGHTENTERPRISES": "NSIT","AVEVAGROUPPLC": "AVV.L","ZILLOWGROUP": "Z",
-       "OKTAINC": "OKTA","UPWORKINC": "UPWK","SALESFORCEINC": "CRM","DELLTECHNOLOGIES": "DELL",
-       "PAGERDUTYINC": "PD","MICROFOCUSINTL": "MCRO.L","FORTINETINC": "FTNT","VEEVASYSTEMS": "VEEV",
-       "ATOSSE": "ATOS.PA","UPSTARTHOLDINGS": "UPST","SUMOLOGIC": "SUMO","SPLUNKINC": "SPLK",
-       "STMICROELECTRONICS": "SGMR.DU","INFINEON": "IFX.F",
-  #--- CAC60  ---            
-        "LVMH": "MC.PA","Hermes International": "RMS.PA",
-       "L'Oreal": "OR.PA","Airbus": "AIR.PA","Schneider Electric": "SU.PA","EssilorLuxottica": "EL.PA",
-       "Safran": "SAF.PA","TotalEnergies": "TTE.PA","Sanofi": "SAN.PA","Air Liquide": "AI.PA",
-       "Vinci": "DG.PA","Engie": "ENGI.PA","Danone": "BN.PA","Thales": "HO.PA","Saint-Gobain": "SGO.PA",
-       "Orange": "ORA.PA","Kering": "KER.PA","Legrand": "LR.PA","Dassault Systemes": "DSY.PA",
-       "ArcelorMittal": "MT.AS","Stellantis": "STLAM.MI","Capgemini": "CAP.PA","Publicis Groupe": "PUB.PA",
-       "Veolia Environnement": "VIE.PA","Dassault Aviation": "AM.PA","Sartorius Stedim Biotech": "DIM.PA",
-       "STMicroelectronics": "STM.PA","Michelin": "ML.PA","Pernod Ricard": "RI.PA","Bouygues": "EN.PA",
-       "Amundi": "AMUN.PA","Unibail-Rodamco-Westfield": "URW.PA","Aeroports de Paris": "ADP.PA",
-       "bioMerieux": "BIM.PA","Euronext": "ENX.PA","Eiffage": "FGR.PA","Bureau Veritas": "BVI.PA",
-       "Alstom": "ALO.PA","Accor": "AC.PA","Eurofins Scientific": "ERF.PA","Renault": "RNO.PA",
-       "Carrefour": "CA.PA","Rexel": "RXL.PA","Klepierre": "LI.PA","Getlink": "GET.PA","SPIE": "SPIE.PA",
-       "Sodexo": "SW.PA","Gecina": "GFC.PA","Gaztransport & Technigaz": "GTT.PA","Technip Energies": "TE.PA",
-       "Nexans": "NEX.PA","Scor": "SCR.PA","Edenred": "EDEN.PA","Arkema": "AKE.PA",
-#--- FTSE100 ---
-       "AstraZeneca": "AZN.L","HSBC Holdings": "HSBA.L","Shell": "SHEL.L","Unilever": "ULVR.L",
-       "BP": "BP.L","GlaxoSmithKline": "GSK.L","British American Tobacco": "BATS.L","Rio Tinto": "RIO.L",
-       "Diageo": "DGE.L","RELX": "REL.L", "London Stock Exchange Group": "LSEG.L","Barclays": "BARC.L",
-       "Lloyds Banking Group": "LLOY.L","NatWest Group": "NWG.L","Standard Chartered": "STAN.L",
-       "Prudential": "PRU.L","Legal & General": "LGEN.L","Aviva": "AV.L","Schroders": "SDR.L",
-       "Experian": "EXPN.L","Reckitt Benckiser": "RKT.L","Compass Group": "CPG.L","Next": "NXT.L",
-        "Associated British Foods": "ABF.L","Ocado Group": "OCDO.L","Marks & Spencer": "MKS.L",
-        "Tesco": "TSCO.L","J Sainsbury": "SBRY.L","Kingfisher": "KGF.L","Persimmon": "PSN.L",
-        "Barratt Developments": "BDEV.L","Taylor Wimpey": "TW.L","Whitbread": "WTB.L",
-        "InterContinental Hotels Group": "IHG.L","Rolls-Royce Holdings": "RR.L","BAE Systems": "BA.L",
-        "Smiths Group": "SMIN.L","Halma": "HLMA.L","Spirax-Sarco Engineering": "SPX.L",
-        "Ashtead Group": "AHT.L","Croda International": "CRDA.L", "Fresnillo": "FRES.L",
-        "Anglo American": "AAL.L","Antofagasta": "ANTO.L","Glencore": "GLEN.L","Rentokil Initial": "RTO.L",
-        "Severn Trent": "SVT.L","United Utilities": "UU.L","National Grid": "NG.L",
-#--- DAX ---
-        "SAP": "SAP.DE","Siemens": "SIE.DE","Allianz": "ALV.DE","Deutsche Telekom": "DTE.DE",
-        "Mercedes-Benz Group": "MBG.DE","BMW": "BMW.DE","Volkswagen": "VOW3.DE",
-        "Porsche Automobil Holding": "PAH3.DE","Porsche AG": "P911.DE","BASF": "BAS.DE",
-        "Bayer": "BAYN.DE","Merck KGaA": "MRK.DE","Siemens Healthineers": "SHL.DE",
-        "Siemens Energy": "ENR.DE","Infineon Technologies": "IFX.DE","RWE": "RWE.DE",
-        "E.ON": "EOAN.DE","Heidelberg Materials": "HEI.DE","MTU Aero Engines": "MTX.DE",
-        "Deutsche Post DHL": "DHL.DE","Deutsche Boerse": "DB1.DE","Munich Re": "MUV2.DE",
-        "Hannover Re": "HNR1.DE","Commerzbank": "CBK.DE","Deutsche Bank": "DBK.DE",
-        "Fresenius": "FRE.DE","Fresenius Medical Care": "FME.DE","Beiersdorf": "BEI.DE",
-        "Henkel": "HEN3.DE","Continental": "CON.DE","Covestro": "1COV.DE","Symrise": "SY1.DE",
-        "Puma": "PUM.DE","Zalando": "ZAL.DE","Delivery Hero": "DHER.DE","Qiagen": "QIA.DE",
-        "Sartorius": "SRT3.DE","Vonovia": "VNA.DE","Brenntag": "BNR.DE",
-        
-        "Apple": "AAPL","Microsoft": "MSFT","Alphabet": "GOOGL","Amazon": "AMZN","Nvidia": "NVDA",
-        "Tesla": "TSLA","Meta Platforms": "META","Berkshire Hathaway": "BRK-A","Johnson & Johnson": "JNJ",
-        "UnitedHealth Group": "UNH","Pfizer": "PFE","Merck & Co": "MRK","AbbVie": "ABBV","Eli Lilly": "LLY",
-        "Amgen": "AMGN","Exxon Mobil": "XOM","Chevron": "CVX","ConocoPhillips": "COP","Coca-Cola": "KO",
-        "PepsiCo": "PEP","Procter & Gamble": "PG","Walmart": "WMT","Costco": "COST","McDonalds": "MCD",
-        "Nike": "NKE","Home Depot": "HD","Disney": "DIS","JPMorgan Chase": "JPM","Bank of America": "BAC",
-        "Wells Fargo": "WFC","Goldman Sachs": "GS","Morgan Stanley": "MS","Citigroup": "C","Charles Schwab": "SCHW",
-        "Ally Financial": "ALLY","BlackRock": "BLK","State Street": "STT","BNY Mellon": "BK","Northern Trust": "NTRS",
-        "Visa": "V","Mastercard": "MA","American Express": "AXP","PayPal": "PYPL","Block": "SQ","Coinbase": "COIN",
-        "Adobe": "ADBE","Oracle": "ORCL","Salesforce": "CRM","ServiceNow": "NOW","Workday": "WDAY","Intuit": "INTU",
-        "Snowflake": "SNOW","ASML Holding": "ASML","Samsung Electronics": "005930.KS","SK Hynix": "000660.KS",
-        "AMD": "AMD","Applied Materials": "AMAT","Lam Research": "LRCX","KLA": "KLAC","Infineon Technologies": "IFX.DE",
-        "STMicroelectronics": "STM.PA","Tencent Holdings": "0700.HK","Alibaba Group": "BABA","JD.com": "JD",
-        "Meituan": "3690.HK","Baidu": "BIDU","NetEase": "NTES","Sony Group": "SONY","Nintendo": "7974.T",
-        "SoftBank Group": "9984.T","Keyence": "6861.T","Hitachi": "6501.T","Fanuc": "6954.T",
-        "Recruit Holdings": "6098.T","Toyota Motor": "TM","Nestle": "NESN.SW","Roche Holding": "ROG.SW",
-        "Novartis": "NOVN.SW","Zurich Insurance Group": "ZURN.SW","Swiss Re": "SREN.SW","UBS Group": "UBSG.SW",
-        "Schneider Electric": "SU.PA","Vinci": "DG.PA", "SAP": "SAP.DE","Siemens": "SIE.DE","Allianz": "ALV.DE",
-        "Deutsche Telekom": "DTE.DE","BMW": "BMW.DE","Mercedes-Benz Group": "MBG.DE","Volkswagen": "VOW3.DE",
-        "BASF": "BAS.DE","Bayer": "BAYN.DE","Munich Re": "MUV2.DE","HSBC Holdings": "HSBA.L",
-        "Shell": "SHEL.L","BP": "BP.L","Unilever": "ULVR.L","Rio Tinto": "RIO.L","Diageo": "DGE.L",
-        "London Stock Exchange Group": "LSEG.L"
-}
-    if clean_input in COMMON_TICKERS:
-        return COMMON_TICKERS[clean_input]
-
-    # 2. Vérification si l'entrée est un Ticker non mappé
-    if len(clean_input) <= 10 and (' ' not in clean_input):
-        if is_valid_ticker(clean_input):
-            return clean_input
-            
-    return None 
+    try:
+        return start_http_server(port)
+    except OSError as e:
+        logging.getLogger(__name__).warning("Endpoint de métriques indisponible sur le port %s : %s", port, e)
+        return None
+
+if os.environ.get("SPOT_METRICS_PORT"):
+    start_metrics_endpoint(int(os.environ["SPOT_METRICS_PORT"]))
 
 # ---------- Interface ----------
 st.title("<Calcul automatique du Spot d’un Produit Structuré>")
 st.markdown("Entrez le **Nom de la compagnie** ou le Ticker (ex: Apple, BNP.PA).")
 
+mode_hors_ligne = st.sidebar.checkbox(
+    "Mode hors-ligne (cache local uniquement)",
+    value=False,
+    help="Les prix sont lus uniquement dans le cache local, sans appel réseau.",
+    key="offline_mode"
+)
+# Ni cache seul ni fichier de prix (SPOT_PRICE_FILE) ne doivent interroger Yahoo
+# pour valider les tickers ou chercher leur devise
+sans_reseau = mode_hors_ligne or bool(os.environ.get("SPOT_PRICE_FILE"))
+
+calcul_auto = st.sidebar.checkbox(
+    "Recalcul automatique",
+    value=True,
+    help="Le spot est recalculé à chaque modification ; seuls les sous-jacents dont le ticker ou les dates ont changé sont re-téléchargés.",
+    key="auto_calc"
+)
+
+DEVISE_LOCALE = "Devise locale (sans conversion)"
+devise_reference = st.sidebar.selectbox(
+    "Devise de référence",
+    options=[DEVISE_LOCALE, *REPORTING_CURRENCIES],
+    help="Chaque prix de constatation est converti dans cette devise au cours de change du même jour.",
+    key="reporting_currency"
+)
+
+# Prix déjà récupérés dans la session :
+# {(ticker, dates, hors-ligne): ([prix ou None], [date du Close retenu ou None])}
+if "prix_cache" not in st.session_state:
+    st.session_state["prix_cache"] = {}
+
+if st.sidebar.button("Rafraîchir les prix"):
+    st.session_state["prix_cache"] = {}
+
 nb_sj = st.number_input("Nombre de sous-jacents", min_value=1, max_value=10, value=2)
 
 # RÉINTÉGRÉ : Sélecteur Global
 mode_calcul_global = st.selectbox(
     "Mode de calcul du prix de constatation (applicable à tous les sous-jacents)",
-    options=[
-        "Moyenne simple",
-        "Cours le plus haut (max)",
-        "Cours le plus bas (min)"
-    ],
+    options=list(MODES),
     key="mode_calc_global"
 )
 
@@ -240,7 +99,13 @@ for i in range(nb_sj):
         key=f"name_or_ticker{i}"
     )
     
-    dates = st.text_area(f"Dates de constatation (JJ/MM/AAAA, une par ligne)", key=f"dates{i}", height=120)
+    dates = st.text_area(
+        f"Dates de constatation (JJ/MM/AAAA, une par ligne)", key=f"dates{i}", height=120,
+        help="Une ligne peut aussi être une règle : « fréquence début fin [convention] », ex. "
+             "« trimestriel 15/01/2024 15/01/2026 suivant-modifie ». Fréquences : quotidien, "
+             "hebdomadaire, mensuel, fin-de-mois, trimestriel, semestriel, annuel. Conventions : "
+             "suivant, suivant-modifie (défaut), precedent, precedent-modifie, aucun."
+    )
     
     ponderation = st.number_input(
         f"Pondération (0 = équi-pondérée) pour {input_name or f'#{i+1}'}",
@@ -248,81 +113,112 @@ for i in range(nb_sj):
     )
     
     if input_name:
-        resolved_ticker = resolve_ticker_from_name(input_name)
-        ticker_to_use = resolved_ticker if resolved_ticker else input_name.strip().upper()
-        
-        dates_list = [d.strip() for d in dates.split("\n") if d.strip()]
+        try:
+            with METRICS.timer("spot_stage_seconds", stage="resolution"):
+                ticker_to_use, info = build_underlying(input_name, dates.split("\n"), ponderation,
+                                                       offline=sans_reseau)
+        except ValueError as e:
+            st.error(str(e))
+            continue
 
-        if not resolved_ticker:
+        if any(is_rule(d) for d in dates.split("\n")) and info["dates"]:
+            st.caption(f"{len(info['dates'])} date(s) générée(s), du {info['dates'][0]} au {info['dates'][-1]}")
+
+        if not info["ticker_found"]:
              st.error(f"Ticker introuvable pour **'{input_name}'**. Utilisation de l'entrée brute : **{ticker_to_use}** (risque d'échec de récupération des prix).")
+             suggestions = suggest_tickers(input_name)
+             if suggestions:
+                 st.caption("Suggestions : " + ", ".join(f"{nom} ({t})" for nom, t in suggestions))
 
-        if dates_list:
-            sous_jacents[ticker_to_use] = { 
-                "dates": dates_list, 
-                "pond": ponderation,
-                "input_name": input_name.strip(), 
-                "resolved_ticker": ticker_to_use   
-            }
-        elif resolved_ticker:
+        if info["dates"]:
+            sous_jacents[ticker_to_use] = info
+        elif info["ticker_found"]:
              st.warning(f" **Attention** : Les dates de constatation pour **{ticker_to_use}** sont manquantes. Ce sous-jacent ne sera pas inclus dans le calcul.")
 
 
 st.write("") 
 
-if st.button("Calculer le spot"):
+lancer_calcul = calcul_auto or st.button("Calculer le spot")
+
+if lancer_calcul:
     if not sous_jacents:
-        st.error("Impossible de lancer le calcul. Vérifiez le Ticker et les dates.")
+        if calcul_auto:
+            st.info("Renseignez au moins un sous-jacent et ses dates de constatation pour lancer le calcul.")
+        else:
+            st.error("Impossible de lancer le calcul. Vérifiez le Ticker et les dates.")
     else:
-        resultats = []
-        spots, pond_total = 0.0, 0.0
+        # Imports différés : inutiles tant qu'aucun calcul n'est lancé
+        import pandas as pd
+        from export import EXPORT_FORMATS, observations_frame, to_csv_bytes, to_excel_bytes, to_parquet_bytes
+        from fetching import fetch_concurrently
 
-        progress = st.progress(0, text="Récupération des données...")
-        total = len(sous_jacents)
-        idx = 0
-        
         # Le mode global est maintenant récupéré depuis le sélecteur
         mode_global = mode_calcul_global 
-        prix_manquants_compteur = 0
-
-        for ticker, info in sous_jacents.items():
-            
-            valeurs = [get_price_on_date(ticker, d) for d in info["dates"]]
-            
-            valeurs_clean = [v for v in valeurs if v is not None]
-
-            if not valeurs_clean:
-                spot = None
-                prix_manquants_compteur += 1
-            else:
-                # RÉINTÉGRÉ : Logique de calcul basée sur le mode global
-                if mode_global == "Moyenne simple":
-                    spot = sum(valeurs_clean) / len(valeurs_clean)
-                elif mode_global == "Cours le plus haut (max)":
-                    spot = max(valeurs_clean)
-                elif mode_global == "Cours le plus bas (min)":
-                    spot = min(valeurs_clean)
-                else: 
-                    spot = sum(valeurs_clean) / len(valeurs_clean) # Fallback sécurité
-
-            pond = info["pond"] if info["pond"] > 0 else 1.0
-            if spot is not None:
-                spots += spot * pond
-                pond_total += pond
-
-            resultats.append({
-                "Nom Entré": info["input_name"],          
-                "Ticker Utilisé": info["resolved_ticker"], 
-                "Dates": ", ".join(info["dates"]),
-                "Valeurs": ", ".join([str(v) if v is not None else "N/A" for v in valeurs]),
-                "Spot": round(spot, 6) if spot is not None else "N/A",
-                "Pondération": pond
-            })
-
-            idx += 1
-            progress.progress(int(idx/total * 100))
-        
-        progress.empty() 
 
+        # Seuls les sous-jacents dont (ticker, dates) a changé depuis le dernier rerun
+        # sont re-téléchargés ; pondérations et mode ne relancent que l'arithmétique.
+        cache_prix = st.session_state["prix_cache"]
+        cles = {t: (t, tuple(info["dates"]), mode_hors_ligne) for t, info in sous_jacents.items()}
+        a_recuperer = {t: info["dates"] for t, info in sous_jacents.items() if cles[t] not in cache_prix}
+        METRICS.inc("spot_session_cache_total", len(cles) - len(a_recuperer), result="hit")
+        METRICS.inc("spot_session_cache_total", len(a_recuperer), result="miss")
+
+        nouveaux = {}
+        if a_recuperer:
+            progress = st.progress(0, text=f"Récupération des données de {len(a_recuperer)} sous-jacent(s)...")
+            # Un seul appel groupé pour le panier (débit limité) : la barre avance par lot
+            # terminé, donc d'un coup pour un panier ; le texte nomme le dernier sous-jacent reçu
+            with METRICS.timer("spot_stage_seconds", stage="fetch"):
+                nouveaux_prix, nouvelles_dates, echecs = fetch_concurrently(
+                    a_recuperer,
+                    get_provider(mode_hors_ligne),
+                    on_done=lambda ticker, fait, total: progress.progress(
+                        int(fait / total * 100), text=f"Récupération des données... ({ticker})"
+                    )
+                )
+            progress.empty()
+            if echecs:
+                st.warning(f"Récupération des prix impossible pour {', '.join(echecs)} (erreur réseau) : "
+                           "nouvel essai au prochain calcul.")
+            nouveaux = {t: (nouveaux_prix[t], nouvelles_dates[t]) for t in a_recuperer}
+            # Un échec ou une réponse sans aucun prix n'est pas figé dans la session
+            for t, (valeurs, _) in nouveaux.items():
+                if t not in echecs and any(v is not None for v in valeurs):
+                    cache_prix[cles[t]] = nouveaux[t]
+
+        # On ne garde que les entrées du panier courant
+        st.session_state["prix_cache"] = {cle: cache_prix[cle] for cle in cles.values() if cle in cache_prix}
+        releves = {t: cache_prix[cles[t]] if cles[t] in cache_prix else nouveaux[t] for t in sous_jacents}
+        prix_panier = {t: valeurs for t, (valeurs, _) in releves.items()}
+        prix_locaux = devises = taux_change = None  # renseignés si les prix sont convertis
+
+        if devise_reference != DEVISE_LOCALE:
+            from fx import convert_prices
+            from providers import PriceFetchError
+            prix_locaux = prix_panier
+            try:
+                with METRICS.timer("spot_stage_seconds", stage="fx"):
+                    prix_panier, devises, taux_change = convert_prices(
+                        prix_locaux, {t: retenues for t, (_, retenues) in releves.items()},
+                        devise_reference, get_provider(mode_hors_ligne), offline=sans_reseau
+                    )
+            except PriceFetchError as e:
+                st.error(f"Conversion en {devise_reference} impossible (erreur réseau) : {e}. "
+                         "Nouvel essai au prochain calcul.")
+                st.stop()
+            st.caption("Devises de cotation : " + ", ".join(
+                f"{t} {devises[t] or '?'}" for t in sous_jacents
+            ) + f" — prix convertis en **{devise_reference}**.")
+            inconnues = [t for t in sous_jacents if devises[t] is None]
+            if inconnues:
+                st.warning(f"Devise inconnue pour {', '.join(inconnues)} : prix non convertibles.")
+
+        with METRICS.timer("spot_stage_seconds", stage="compute"):
+            calcul = compute_basket(sous_jacents, prix_panier, mode_global)
+        resultats = calcul["resultats"]
+        prix_manquants_compteur = calcul["manquants"]
+
+        debut_rendu = time.perf_counter()
         df = pd.DataFrame(resultats)
         st.subheader("- Résultats individuels par Sous-Jacent -")
         st.dataframe(df)
@@ -331,33 +227,88 @@ if st.button("Calculer le spot"):
             st.warning(f"Attention : {prix_manquants_compteur} sous-jacent(s) n'a/ont pas pu avoir son/leur spot calculé (Ticker non reconnu ou données manquantes).")
 
 
-        if pond_total == 0:
+        spot_global = calcul["spot_global"]
+        if spot_global is None:
             st.error("Impossible de calculer le spot global : pondération totale = 0 ou pas de prix valides. Vérifiez vos dates.")
         else:
-            spot_global = spots / pond_total
             st.subheader("- Spot global pondéré -")
             st.metric("Spot global", f"{spot_global:.6f}")
             st.info(f"Mode de calcul des spots individuels : **{mode_global}**") # Affichage du mode
 
-            # Graphique simple : barres des spots
+            # Tous les modes sont calculés dans la même passe vectorisée
+            with st.expander("Sensibilité au mode de calcul"):
+                st.dataframe(pd.DataFrame([
+                    {"Mode": m, "Spot global": round(v, 6) if v is not None else "N/A"}
+                    for m, v in calcul["spot_global_par_mode"].items()
+                ]), hide_index=True)
+
+            # Graphique simple : barres des spots (rendu natif, aucune figure à libérer)
             try:
-                fig, ax = plt.subplots(figsize=(10,4))
                 df_plot = df[df["Spot"] != "N/A"].set_index("Ticker Utilisé")
-                ax.bar(df_plot.index, df_plot["Spot"].astype(float))
-                ax.set_ylabel("Spot")
-                ax.set_title("Spot par sous-jacent")
-                st.pyplot(fig)
+                st.caption("Spot par sous-jacent")
+                st.bar_chart(df_plot["Spot"].astype(float), y_label="Spot")
             except Exception:
                  st.warning("Impossible de générer le graphique.")
 
-            # Export Excel
-            to_export = df.copy()
-            with pd.ExcelWriter("spots_export.xlsx", engine="openpyxl") as out:
-                to_export.to_excel(out, index=False, sheet_name="Spots")
-            with open("spots_export.xlsx", "rb") as f:
-                st.download_button(
-                    label="Télécharger le résultat Excel",
-                    data=f,
-                    file_name="spots.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            METRICS.observe("spot_stage_seconds", time.perf_counter() - debut_rendu, stage="render")
+
+            # Export en mémoire : rien n'est écrit sur le disque partagé entre sessions
+            debut_export = time.perf_counter()
+            observations = observations_frame(sous_jacents, prix_panier, prix_locaux, devises, taux_change)
+            synthese = pd.DataFrame([
+                {"Mode": mode_global, "Spot global": spot_global, "Sous-jacents": len(df),
+                 "Sans prix": prix_manquants_compteur,
+                 "Devise": devise_reference if devise_reference != DEVISE_LOCALE else "locale"}
+            ])
+            col_xlsx, col_csv, col_parquet = st.columns(3)
+            col_xlsx.download_button(
+                label="Télécharger le résultat Excel",
+                data=to_excel_bytes({"Spots": df, "Observations": observations, "Synthèse": synthese}),
+                file_name="spots.xlsx",
+                mime=EXPORT_FORMATS["xlsx"][1]
+            )
+            col_csv.download_button(
+                label="Télécharger en CSV",
+                data=to_csv_bytes(df),
+                file_name="spots.csv",
+                mime=EXPORT_FORMATS["csv"][1]
+            )
+            try:
+                col_parquet.download_button(
+                    label="Télécharger en Parquet",
+                    data=to_parquet_bytes(df),
+                    file_name="spots.parquet",
+                    mime=EXPORT_FORMATS["parquet"][1]
                 )
+            except ImportError:
+                col_parquet.caption("Export Parquet indisponible (pyarrow non installé).")
+            METRICS.observe("spot_stage_seconds", time.perf_counter() - debut_export, stage="export")
+
+# ---------- Instrumentation ----------
+METRICS.observe("spot_stage_seconds", time.perf_counter() - _debut_script, stage="script")
+
+if st.sidebar.checkbox("Afficher l'instrumentation", value=False, key="show_metrics"):
+    with st.sidebar.expander("Instrumentation (processus)", expanded=True):
+        etat = METRICS.snapshot()
+        hits = METRICS.counter("spot_price_cache_total", result="hit")
+        misses = METRICS.counter("spot_price_cache_total", result="miss")
+        st.metric("Requêtes réseau", sum(c["value"] for c in etat["counters"]
+                                         if c["name"] == "spot_network_requests_total"))
+        st.metric("Taux de hit du cache de prix", f"{hits / (hits + misses):.0%}" if hits + misses else "N/A")
+        st.caption("Durées")
+        st.dataframe([
+            {"Mesure": t["name"], "Étiquettes": ", ".join(f"{k}={v}" for k, v in t["labels"].items()),
+             "Nombre": t["count"], "Total (ms)": round(t["sum_s"] * 1000, 1),
+             "Moyenne (ms)": round(t["sum_s"] / t["count"] * 1000, 1), "Max (ms)": round(t["max_s"] * 1000, 1)}
+            for t in etat["timings"]
+        ], hide_index=True)
+        st.caption("Compteurs")
+        st.dataframe([
+            {"Compteur": c["name"], "Étiquettes": ", ".join(f"{k}={v}" for k, v in c["labels"].items()),
+             "Valeur": c["value"]}
+            for c in etat["counters"]
+        ], hide_index=True)
+        st.download_button("Export JSON", METRICS.to_json(), file_name="metrics.json",
+                           mime="application/json")
+        st.download_button("Export Prometheus", METRICS.to_prometheus(), file_name="metrics.prom",
+                           mime="text/plain")
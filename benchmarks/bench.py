@@ -0,0 +1,164 @@
+# benchmarks/bench.py
+"""
+Benchmarks de bout en bout sur données enregistrées (aucun appel à Yahoo) :
+latence, nombre d'appels au fournisseur de prix et pic mémoire, par scénario
+(sous-jacents × dates par produit, nombre de produits).
+
+    python benchmarks/bench.py                         # fixture synthétique
+    python benchmarks/bench.py --fixture prix.csv      # historiques enregistrés
+    python benchmarks/bench.py --record prix.csv       # enregistre depuis Yahoo puis mesure
+
+Chaque exécution ajoute une ligne JSON à --output (défaut : benchmarks/results.jsonl),
+pour comparer les exécutions dans le temps.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import (DEBUT, FIN, CountingProvider, bench_underlyings,  # noqa: E402
+                      record_fixture, synthetic_fixture)
+from engine import build_product, price_products  # noqa: E402
+from providers import CachedProvider, FileProvider, SharedPriceStore  # noqa: E402
+from tickers import resolve_ticker_from_name  # noqa: E402
+
+# nom -> (produits, sous-jacents par produit, dates par sous-jacent)
+SCENARIOS = {
+    "1x10": (1, 1, 10),
+    "10x40": (1, 10, 40),
+    "500x5x250": (500, 5, 250),
+}
+NB_TICKERS = 50  # univers dans lequel les produits piochent leurs sous-jacents
+
+
+def make_products(nb_produits, nb_sj, nb_dates, univers, seed=0):
+    """Produits déterministes : sous-jacents tirés dans l'univers, dates ouvrées consécutives."""
+    rng = np.random.default_rng(seed)
+    jours = pd.bdate_range(DEBUT, FIN, inclusive="left")
+    produits = []
+    for i in range(nb_produits):
+        choix = rng.choice(len(univers), size=min(nb_sj, len(univers)), replace=False)
+        debut = int(rng.integers(0, len(jours) - nb_dates))
+        dates = [d.strftime("%d/%m/%Y") for d in jours[debut:debut + nb_dates]]
+        underlyings = [(univers[j][0], dates, 0.0) for j in choix]
+        produits.append(build_product(f"P{i}", underlyings, "Moyenne simple"))
+    return produits
+
+
+def _run(produits, provider):
+    nb = sum(1 for _ in price_products(produits, provider))
+    assert nb == len(produits)
+
+
+def run_scenario(nom, fixture, univers, repeat):
+    """
+    Mesure un scénario à froid (cache SQLite vide), à chaud (cache rempli), puis servi
+    par la mémoire partagée entre sessions (SharedPriceStore déjà remplie). Les
+    latences sont mesurées sans tracemalloc ; le pic mémoire l'est sur une passe à
+    froid séparée, tracemalloc ralentissant fortement l'exécution.
+    """
+    nb_produits, nb_sj, nb_dates = SCENARIOS[nom]
+    produits = make_products(nb_produits, nb_sj, nb_dates, univers)
+    source = FileProvider(fixture)
+    mesures = {"froid": [], "chaud": [], "memoire": []}
+    appels = {}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            compteur = CountingProvider(source)
+            provider = CachedProvider(compteur, path=os.path.join(tmp, "cache.sqlite"))
+            partage = SharedPriceStore(provider)
+            for phase in ("froid", "chaud", "memoire"):
+                if phase == "memoire":
+                    provider = partage
+                    _run(produits, provider)  # remplissage de la mémoire partagée
+                avant = compteur.calls
+                t0 = time.perf_counter()
+                _run(produits, provider)
+                mesures[phase].append((time.perf_counter() - t0) * 1000)
+                appels[phase] = compteur.calls - avant
+
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = CachedProvider(source, path=os.path.join(tmp, "cache.sqlite"))
+        tracemalloc.start()
+        _run(produits, provider)
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "produits": nb_produits,
+        "sous_jacents": nb_sj,
+        "dates": nb_dates,
+        "latence_froid_ms": statistics.median(mesures["froid"]),
+        "latence_chaud_ms": statistics.median(mesures["chaud"]),
+        "latence_memoire_ms": statistics.median(mesures["memoire"]),
+        "appels_fournisseur_froid": appels["froid"],
+        "appels_fournisseur_chaud": appels["chaud"],
+        "appels_fournisseur_memoire": appels["memoire"],
+        "pic_memoire_mo": pic / 1e6,
+    }
+
+
+def run_resolution(univers, repeat):
+    """Latence de résolution des noms (index normalisé, sans validation réseau)."""
+    noms = [nom.title() for nom, _ in univers]
+    durees = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for nom in noms:
+            resolve_ticker_from_name(nom)
+        durees.append((time.perf_counter() - t0) * 1000)
+    return {"noms": len(noms), "latence_ms": statistics.median(durees)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du calcul de spot sur données enregistrées.")
+    parser.add_argument("--fixture", help="Fichier de prix enregistrés (CSV date,ticker,close ou JSON)")
+    parser.add_argument("--record", help="Enregistre d'abord les historiques depuis Yahoo dans ce fichier")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scénario à lancer (répétable, défaut : tous)")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions par scénario (médiane)")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl"),
+                        help="Fichier JSON Lines auquel ajouter les résultats")
+    args = parser.parse_args(argv)
+
+    univers = bench_underlyings(NB_TICKERS)
+    tickers = [t for _, t in univers]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.record:
+            fixture, origine = record_fixture(args.record, tickers), "enregistrée"
+        elif args.fixture:
+            fixture, origine = args.fixture, "enregistrée"
+        else:
+            fixture, origine = synthetic_fixture(os.path.join(tmp, "prix.csv"), tickers), "synthétique"
+
+        resultat = {
+            "horodatage": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "fixture": origine,
+            "resolution": run_resolution(univers, args.repeat),
+            "scenarios": {},
+        }
+        for nom in args.scenario or SCENARIOS:
+            resultat["scenarios"][nom] = run_scenario(nom, fixture, univers, args.repeat)
+            print(f"{nom}: {json.dumps(resultat['scenarios'][nom])}", file=sys.stderr)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(resultat, ensure_ascii=False) + "\n")
+    print(json.dumps(resultat, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/fixtures.py
+"""
+Données de prix pour les benchmarks : à la place de yfinance, les scénarios lisent des
+historiques enregistrés (FileProvider). Le fichier peut être enregistré depuis Yahoo
+une fois pour toutes (record_fixture) ou généré de façon déterministe (synthetic_fixture)
+pour tourner sans réseau.
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from providers import PriceProvider, RecordingProvider, YFinanceProvider, save_closes_file  # noqa: E402
+from tickers import COMMON_TICKERS  # noqa: E402
+
+DEBUT, FIN = "2021-01-01", "2024-01-01"
+
+
+def bench_underlyings(n):
+    """n couples (nom, ticker) distincts de la table des noms courants, dans un ordre fixe."""
+    vus, couples = set(), []
+    for nom, ticker in COMMON_TICKERS.items():
+        if ticker and ticker not in vus and nom == nom.upper():
+            vus.add(ticker)
+            couples.append((nom, ticker))
+        if len(couples) == n:
+            break
+    return couples
+
+
+def synthetic_fixture(path, tickers, start=DEBUT, end=FIN, seed=0):
+    """Marche aléatoire de Close sur les jours ouvrés de [start, end[, enregistrée dans path."""
+    rng = np.random.default_rng(seed)
+    jours = pd.bdate_range(start, end, inclusive="left")
+    series = {}
+    for ticker in tickers:
+        rendements = rng.normal(0, 0.015, len(jours))
+        series[ticker.upper()] = pd.Series(100 * np.exp(np.cumsum(rendements)), index=jours)
+    save_closes_file(series, path)
+    return path
+
+
+def record_fixture(path, tickers, start=DEBUT, end=FIN):
+    """Enregistre les historiques réels (yfinance) des tickers dans path."""
+    recorder = RecordingProvider(YFinanceProvider())
+    recorder.get_closes(tickers, pd.Timestamp(start), pd.Timestamp(end))
+    save_closes_file(recorder.recorded, path)
+    return path
+
+
+class CountingProvider(PriceProvider):
+    """Compte les appels faits au fournisseur amont et les tickers demandés."""
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.calls = 0
+        self.tickers = 0
+        self._lock = threading.Lock()
+
+    def get_closes(self, tickers, start, end):
+        tickers = list(tickers)
+        with self._lock:
+            self.calls += 1
+            self.tickers += len(tickers)
+        return self.upstream.get_closes(tickers, start, end)
@@ -0,0 +1,80 @@
+# benchmarks/startup.py
+"""
+Mesure du démarrage à froid de l'application, chaque mesure dans un processus neuf :
+  - import des modules chargés au rendu du formulaire (engine, tickers) ;
+  - premier rendu complet de app.py (streamlit.testing.AppTest), sans saisie ;
+  - modules lourds effectivement chargés à ce stade (pandas, yfinance, openpyxl...).
+
+    python benchmarks/startup.py [--runs 5] [--output startup.json] [--budget-ms 1500]
+
+Avec --budget-ms, le code de sortie vaut 1 si la médiane du premier rendu dépasse le budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES_LOURDS = ["pandas", "yfinance", "matplotlib", "openpyxl", "pyarrow"]
+
+SONDE = """
+import json, sys, time
+sys.path.insert(0, {racine!r})
+t0 = time.perf_counter()
+import engine, tickers
+t1 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t2 = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_modules_ms": (t1 - t0) * 1000,
+    "premier_rendu_ms": (t3 - t2) * 1000,
+    "exception": bool(at.exception),
+    "modules_lourds": [m for m in {lourds!r} if m in sys.modules],
+}}))
+"""
+
+
+def mesure():
+    """Lance une sonde dans un interpréteur neuf et renvoie ses mesures."""
+    code = SONDE.format(racine=RACINE, app=os.path.join(RACINE, "app.py"), lourds=MODULES_LOURDS)
+    sortie = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True, cwd=RACINE)
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure du démarrage à froid de app.py.")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de processus mesurés")
+    parser.add_argument("--output", help="Fichier JSON de résultats (défaut : sortie standard)")
+    parser.add_argument("--budget-ms", type=float, help="Budget maximal (médiane du premier rendu)")
+    args = parser.parse_args(argv)
+
+    runs = [mesure() for _ in range(args.runs)]
+    resultat = {
+        "runs": args.runs,
+        "import_modules_ms_median": statistics.median(r["import_modules_ms"] for r in runs),
+        "premier_rendu_ms_median": statistics.median(r["premier_rendu_ms"] for r in runs),
+        "premier_rendu_ms_max": max(r["premier_rendu_ms"] for r in runs),
+        "exception": any(r["exception"] for r in runs),
+        "modules_lourds": sorted({m for r in runs for m in r["modules_lourds"]}),
+    }
+    texte = json.dumps(resultat, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(texte + "\n")
+    else:
+        print(texte)
+
+    if args.budget_ms is not None and resultat["premier_rendu_ms_median"] > args.budget_ms:
+        print(f"Budget dépassé : {resultat['premier_rendu_ms_median']:.0f} ms > {args.budget_ms:.0f} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# cli.py
+"""
+Mode batch : calcule le spot global de tout un book de produits, sans Streamlit.
+
+    python cli.py produits.csv -o spots.csv
+    python cli.py produits.jsonl --format jsonl --offline
+    python cli.py produits.csv --format parquet -o spots.parquet
+    python cli.py produits.csv --currency EUR
+
+Entrées acceptées :
+  - CSV, une ligne par sous-jacent : product_id,underlying,dates,weight,mode
+    (dates JJ/MM/AAAA séparées par « ; », lignes d'un même produit consécutives) ;
+    une règle de calendrier peut remplacer une date, ex. « trimestriel 15/01/2024
+    15/01/2026 suivant-modifie » (voir schedule.py) ;
+  - JSON Lines, un produit par ligne :
+    {"id": ..., "mode": ..., "underlyings": [{"name": ..., "dates": [...], "weight": ...}]} ;
+  - JSON : liste de produits au même format (chargée en entier).
+Avec --currency, tous les prix sont convertis dans la devise de référence (voir fx.py).
+Les résultats sont écrits produit par produit, au fil du calcul. Un produit invalide
+(règle de dates ou pondération illisible), ou dont les cours de change n'ont pu être
+obtenus, sort en ligne d'erreur, spot_global vide et colonne erreur renseignée, sans
+interrompre le reste du book.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from itertools import groupby
+
+from engine import build_product, is_rule, normalize_mode, price_products
+from export import JsonlStreamWriter, open_stream_writer
+from fx import REPORTING_CURRENCIES
+from providers import make_provider
+
+COLONNES_SORTIE = ["product_id", "mode", "spot_global", "nb_sous_jacents", "manquants", "spots", "devise",
+                   "erreur"]
+TYPES_SORTIE = {
+    "product_id": "string", "mode": "string", "spot_global": "float64",
+    "nb_sous_jacents": "int64", "manquants": "int64", "spots": "string", "devise": "string",
+    "erreur": "string",
+}
+FORMATS_BINAIRES = ("xlsx", "parquet")
+
+# ---------- Lecture ----------
+
+def split_dates(text):
+    """
+    « 01/02/2024; 01/05/2024 » -> ["01/02/2024", "01/05/2024"]. Un élément commençant
+    par une lettre est une règle de calendrier (« mensuel 15/01/2024 15/12/2024 »), gardée
+    entière.
+    """
+    dates = []
+    for item in re.split(r"[;|\n]+", text or ""):
+        item = item.strip()
+        if is_rule(item):
+            dates.append(item)
+        else:
+            dates.extend(d for d in item.split() if d)
+    return dates
+
+def error_product(product_id, mode, erreur):
+    """Produit sans sous-jacent portant son erreur : il sort en ligne d'erreur."""
+    return {"id": product_id, "mode": normalize_mode(mode), "sous_jacents": {}, "erreur": erreur}
+
+def read_csv_products(f, offline=False):
+    """Produits d'un CSV long (une ligne par sous-jacent), lus en flux."""
+    lignes = csv.DictReader(f)
+    for product_id, groupe in groupby(lignes, key=lambda row: row["product_id"]):
+        groupe = list(groupe)
+        try:
+            underlyings = [
+                (row["underlying"], split_dates(row["dates"]), float(row.get("weight") or 0))
+                for row in groupe
+            ]
+            product = build_product(product_id, underlyings, groupe[0].get("mode"), offline=offline)
+        except ValueError as e:
+            product = error_product(product_id, groupe[0].get("mode"), str(e))
+        yield product
+
+def _product_from_json(obj, offline=False):
+    product_id = str(obj.get("id", ""))
+    try:
+        underlyings = [
+            (u["name"], u["dates"], float(u.get("weight") or 0))
+            for u in obj.get("underlyings", [])
+        ]
+        return build_product(product_id, underlyings, obj.get("mode"), offline=offline)
+    except ValueError as e:
+        return error_product(product_id, obj.get("mode"), str(e))
+
+def read_json_products(f, lines=True, offline=False):
+    """Produits d'un fichier JSON Lines (en flux) ou d'une liste JSON."""
+    if lines:
+        for ligne in f:
+            if ligne.strip():
+                yield _product_from_json(json.loads(ligne), offline)
+    else:
+        for obj in json.load(f):
+            yield _product_from_json(obj, offline)
+
+def read_products(f, path, offline=False):
+    """
+    Choisit le lecteur selon l'extension du fichier d'entrée. offline : les tickers
+    inconnus sont acceptés tels quels, sans vérification réseau.
+    """
+    ext = path.lower().rsplit(".", 1)[-1]
+    if ext in ("jsonl", "ndjson"):
+        return read_json_products(f, lines=True, offline=offline)
+    if ext == "json":
+        return read_json_products(f, lines=False, offline=offline)
+    return read_csv_products(f, offline=offline)
+
+# ---------- Écriture ----------
+
+def result_row(product, calcul, currency=None):
+    """Ligne de sortie d'un produit (devise : None si les prix restent en devise locale)."""
+    return {
+        "product_id": product["id"],
+        "mode": product["mode"],
+        "spot_global": calcul["spot_global"],
+        "nb_sous_jacents": len(calcul["resultats"]),
+        "manquants": calcul["manquants"],
+        "spots": ";".join(f"{r['Ticker Utilisé']}={r['Spot']}" for r in calcul["resultats"]),
+        "devise": currency,
+        "erreur": product.get("erreur"),
+    }
+
+def write_results(results, writer, currency=None):
+    """
+    Écrit les résultats au fil de l'eau, un produit par ligne ; chaque produit en
+    erreur est aussi signalé sur la sortie d'erreur. Retourne (nb produits, nb erreurs).
+    """
+    nb = nb_erreurs = 0
+    for product, calcul in results:
+        ligne = result_row(product, calcul, currency)
+        if isinstance(writer, JsonlStreamWriter):
+            ligne["sous_jacents"] = calcul["resultats"]
+        writer.write(ligne)
+        nb += 1
+        if ligne["erreur"]:
+            nb_erreurs += 1
+            print(f"Produit {product['id']} ignoré : {ligne['erreur']}", file=sys.stderr)
+    return nb, nb_erreurs
+
+# ---------- Point d'entrée ----------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcul batch du spot de produits structurés.")
+    parser.add_argument("input", help="Fichier des produits (.csv, .jsonl ou .json)")
+    parser.add_argument("-o", "--output", help="Fichier de sortie (défaut : sortie standard)")
+    parser.add_argument("--format", choices=["csv", "jsonl", "xlsx", "parquet"], default="csv",
+                        help="Format de sortie (xlsx et parquet exigent --output)")
+    parser.add_argument("--offline", action="store_true", help="N'utiliser que le cache local des prix")
+    parser.add_argument("--prices", help="Fichier de prix enregistrés à utiliser à la place de yfinance")
+    parser.add_argument("--cache", help="Chemin du cache SQLite des prix")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Nombre de produits par lot")
+    parser.add_argument("--workers", type=int, default=4, help="Téléchargements simultanés")
+    parser.add_argument("--currency", choices=REPORTING_CURRENCIES,
+                        help="Devise de référence des prix (défaut : devise locale de chaque sous-jacent)")
+    args = parser.parse_args(argv)
+
+    if args.format in FORMATS_BINAIRES and not args.output:
+        parser.error(f"--format {args.format} exige un fichier de sortie (--output)")
+
+    provider = make_provider(offline=args.offline, price_file=args.prices, cache_path=args.cache)
+    # Ni cache seul ni stub fichier ne doivent déclencher d'appel réseau (tickers, devises)
+    sans_reseau = args.offline or bool(args.prices or os.environ.get("SPOT_PRICE_FILE"))
+    if args.format in FORMATS_BINAIRES:
+        out = args.output
+    elif args.output:
+        out = open(args.output, "w", newline="", encoding="utf-8")
+    else:
+        out = sys.stdout
+    try:
+        with open(args.input, newline="", encoding="utf-8") as f, \
+                open_stream_writer(args.format, out, COLONNES_SORTIE, TYPES_SORTIE) as writer:
+            results = price_products(read_products(f, args.input, offline=sans_reseau), provider,
+                                     chunk_size=args.chunk_size, currency=args.currency,
+                                     offline=sans_reseau, max_workers=args.workers)
+            nb, nb_erreurs = write_results(results, writer, args.currency)
+    finally:
+        if hasattr(out, "close") and out is not sys.stdout:
+            out.close()
+    print(f"{nb} produit(s) calculé(s)" + (f", dont {nb_erreurs} en erreur." if nb_erreurs else "."),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
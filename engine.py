@@ -0,0 +1,245 @@
+# engine.py
+"""
+Moteur de calcul du spot, sans dépendance à Streamlit : résolution des sous-jacents,
+récupération des prix et spot global pondéré. Utilisé par l'interface (app.py) et
+par le mode batch en ligne de commande (cli.py).
+"""
+from itertools import islice
+
+import numpy as np
+
+from tickers import resolve_ticker_from_name
+
+MODE_MOYENNE = "Moyenne simple"
+MODE_MAX = "Cours le plus haut (max)"
+MODE_MIN = "Cours le plus bas (min)"
+MODES = (MODE_MOYENNE, MODE_MAX, MODE_MIN)
+
+# Noms courts acceptés en entrée batch
+MODE_ALIASES = {"moyenne": MODE_MOYENNE, "mean": MODE_MOYENNE, "max": MODE_MAX, "min": MODE_MIN}
+
+# ---------- Construction des produits ----------
+
+def normalize_mode(mode):
+    """Libellé complet du mode de calcul (accepte aussi moyenne/mean/max/min)."""
+    if not mode:
+        return MODE_MOYENNE
+    mode = mode.strip()
+    return MODE_ALIASES.get(mode.lower(), mode)
+
+def is_rule(line):
+    """Une ligne commençant par une lettre est une règle de calendrier, pas une date."""
+    line = line.strip()
+    return bool(line) and line[0].isalpha()
+
+def observation_dates(lines, ticker):
+    """
+    Dates de constatation JJ/MM/AAAA d'un sous-jacent. Les lignes de règle
+    (« mensuel 15/01/2024 15/12/2024 ») sont développées sur le calendrier de la place
+    du ticker (voir schedule.py) ; lève ValueError si une règle est invalide.
+    """
+    lines = [d.strip() for d in lines if d.strip()]
+    if not any(is_rule(d) for d in lines):
+        return lines
+    from schedule import expand_dates  # Import différé (pandas)
+    return expand_dates(lines, ticker)
+
+def build_underlying(name_or_ticker, dates, pond=0.0, offline=False):
+    """
+    Sous-jacent au format de l'application : (ticker utilisé, infos).
+    Si la résolution échoue, l'entrée brute en majuscules est utilisée comme ticker et
+    infos["ticker_found"] vaut False. Lève ValueError si une règle de dates est invalide.
+    offline : pas de vérification réseau des tickers inconnus (voir resolve_ticker_from_name).
+    """
+    resolved = resolve_ticker_from_name(name_or_ticker, offline=offline)
+    ticker = resolved if resolved else name_or_ticker.strip().upper()
+    return ticker, {
+        "dates": observation_dates(dates, ticker),
+        "pond": pond,
+        "input_name": name_or_ticker.strip(),
+        "resolved_ticker": ticker,
+        "ticker_found": bool(resolved),
+    }
+
+def build_product(product_id, underlyings, mode=MODE_MOYENNE, offline=False):
+    """Produit à partir de [(nom ou ticker, [dates JJ/MM/AAAA], pondération), ...]."""
+    sous_jacents = {}
+    for name, dates, pond in underlyings:
+        ticker, info = build_underlying(name, dates, pond, offline=offline)
+        if info["dates"]:
+            sous_jacents[ticker] = info
+    return {"id": product_id, "mode": normalize_mode(mode), "sous_jacents": sous_jacents}
+
+# ---------- Calcul ----------
+
+def observation_cube(paniers):
+    """
+    Range les prix de constatation de plusieurs produits dans un tableau
+    produits × sous-jacents × dates. paniers : [[(valeurs, pond), ...] par produit].
+    Les prix manquants (None) et les cases de remplissage valent NaN ; les pondérations
+    (produits × sous-jacents) suivent la règle de l'application (0 -> 1.0) et valent 0
+    pour le remplissage.
+    """
+    nb_produits = len(paniers)
+    nb_sj = max((len(p) for p in paniers), default=0)
+    nb_dates = max((len(v) for p in paniers for v, _ in p), default=0)
+    cube = np.full((nb_produits, nb_sj, nb_dates), np.nan)
+    poids = np.zeros((nb_produits, nb_sj))
+    for i, panier in enumerate(paniers):
+        for j, (valeurs, pond) in enumerate(panier):
+            cube[i, j, :len(valeurs)] = [np.nan if v is None else v for v in valeurs]
+            poids[i, j] = pond if pond > 0 else 1.0
+    return cube, poids
+
+def spots_by_mode(cube):
+    """
+    Spots de chaque sous-jacent pour tous les modes, en une passe vectorisée :
+    {mode: tableau produits × sous-jacents}, NaN si aucun prix n'est disponible.
+    Les prix manquants sont ignorés, comme dans le calcul historique.
+    """
+    manquant = np.isnan(cube)
+    nb = (~manquant).sum(axis=2)
+    ok = nb > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        moyenne = np.where(manquant, 0.0, cube).sum(axis=2) / nb
+    return {
+        MODE_MOYENNE: np.where(ok, moyenne, np.nan),
+        MODE_MAX: np.where(ok, np.where(manquant, -np.inf, cube).max(axis=2, initial=-np.inf), np.nan),
+        MODE_MIN: np.where(ok, np.where(manquant, np.inf, cube).min(axis=2, initial=np.inf), np.nan),
+    }
+
+def weighted_global(spots, poids):
+    """
+    Spot global pondéré sur les sous-jacents ayant un spot (NaN si aucun).
+    spots : produits × sous-jacents ; poids de même forme, ou W × produits × sous-jacents
+    (ou W × 1 × sous-jacents) pour un balayage de W vecteurs de pondération.
+    """
+    valide = ~np.isnan(spots)
+    w = np.where(valide, poids, 0.0)
+    total = (w * np.where(valide, spots, 0.0)).sum(axis=-1)
+    pond_total = w.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(pond_total > 0, total / pond_total, np.nan)
+
+def weight_sweep(spots, vecteurs):
+    """
+    Table de sensibilité : spot global de chaque produit pour chacun des W vecteurs de
+    pondération (W × sous-jacents, 0 = équi-pondéré). Retourne un tableau W × produits.
+    """
+    vecteurs = np.asarray(vecteurs, dtype=float)
+    poids = np.where(vecteurs > 0, vecteurs, 1.0)[:, None, :]
+    return weighted_global(spots, poids)
+
+def _to_float(x):
+    return None if np.isnan(x) else float(x)
+
+def compute_baskets(paniers):
+    """
+    Calcule plusieurs paniers d'un coup. paniers : [(sous_jacents, prix_panier, mode), ...]
+    avec sous_jacents = {ticker: infos} et prix_panier = {ticker: [prix ou None]}.
+    Tous les modes sont évalués dans la même passe ; chaque résultat contient
+    {"resultats": [lignes par sous-jacent], "spot_global": float ou None,
+    "spot_global_par_mode": {mode: float ou None}, "manquants": nombre de sous-jacents
+    sans aucun prix}.
+    """
+    cube, poids = observation_cube([
+        [(prix_panier[t], info["pond"]) for t, info in sous_jacents.items()]
+        for sous_jacents, prix_panier, _ in paniers
+    ])
+    spots = spots_by_mode(cube)
+    globaux = {m: weighted_global(s, poids) for m, s in spots.items()}
+
+    sorties = []
+    for i, (sous_jacents, prix_panier, mode) in enumerate(paniers):
+        mode = mode if mode in spots else MODE_MOYENNE  # Fallback sécurité
+        resultats = []
+        for j, (ticker, info) in enumerate(sous_jacents.items()):
+            valeurs = prix_panier[ticker]
+            spot = _to_float(spots[mode][i, j])
+            resultats.append({
+                "Nom Entré": info["input_name"],
+                "Ticker Utilisé": info["resolved_ticker"],
+                "Dates": ", ".join(info["dates"]),
+                "Valeurs": ", ".join([str(v) if v is not None else "N/A" for v in valeurs]),
+                "Spot": round(spot, 6) if spot is not None else "N/A",
+                "Pondération": float(poids[i, j])
+            })
+        sorties.append({
+            "resultats": resultats,
+            "spot_global": _to_float(globaux[mode][i]),
+            "spot_global_par_mode": {m: _to_float(g[i]) for m, g in globaux.items()},
+            "manquants": int(np.isnan(spots[mode][i, :len(sous_jacents)]).sum()),
+        })
+    return sorties
+
+def compute_basket(sous_jacents, prix_panier, mode):
+    """Spots individuels et spot global pondéré d'un panier (voir compute_baskets)."""
+    return compute_baskets([(sous_jacents, prix_panier, mode)])[0]
+
+# ---------- Batch ----------
+
+def fetch_products_prices(products, provider, **fetch_options):
+    """
+    Prix de constatation de plusieurs produits, un seul téléchargement par ticker :
+    les dates de tous les produits partageant un sous-jacent sont regroupées.
+    Retourne ({ticker: {date: prix ou None}}, {ticker: {date: date du Close retenu ou None}}).
+    """
+    from fetching import fetch_concurrently  # Import différé (pandas, yfinance)
+
+    dates_par_ticker = {}
+    for product in products:
+        for ticker, info in product["sous_jacents"].items():
+            dates_par_ticker.setdefault(ticker, {}).update(dict.fromkeys(info["dates"]))
+    dates_par_ticker = {t: list(dates) for t, dates in dates_par_ticker.items()}
+    prix, retenues, _ = fetch_concurrently(dates_par_ticker, provider, **fetch_options)
+    return ({t: dict(zip(dates, prix[t])) for t, dates in dates_par_ticker.items()},
+            {t: dict(zip(dates, retenues[t])) for t, dates in dates_par_ticker.items()})
+
+def convert_products_prices(prix_par_date, retenues_par_date, currency, provider, offline=False):
+    """
+    Table {ticker: {date: prix}} convertie en devise de référence (voir fx.py), au cours
+    de change du jour de chaque Close retenu (retenues_par_date, même forme).
+    """
+    from fx import convert_prices  # Import différé (pandas)
+
+    convertis, _, _ = convert_prices({t: list(table.values()) for t, table in prix_par_date.items()},
+                                  {t: list(retenues_par_date[t].values()) for t in prix_par_date},
+                                  currency, provider, offline=offline)
+    return {t: dict(zip(table, convertis[t])) for t, table in prix_par_date.items()}
+
+def product_prices(product, prix_par_date):
+    """Prix {ticker: [prix ou None]} d'un produit, lus dans la table {ticker: {date: prix}}."""
+    return {
+        t: [prix_par_date[t][d] for d in info["dates"]]
+        for t, info in product["sous_jacents"].items()
+    }
+
+def price_products(products, provider, chunk_size=500, currency=None, offline=False, **fetch_options):
+    """
+    Générateur (produit, résultat de compute_baskets) sur un flux de produits.
+    Les produits sont traités par lots de chunk_size : la mémoire reste bornée par la
+    taille d'un lot quelle que soit la taille du book, et chaque ticker n'est téléchargé
+    qu'une fois par lot (le cache du fournisseur évite de le refaire d'un lot à l'autre).
+    Si currency est renseignée, les prix sont convertis dans cette devise avant calcul ;
+    offline limite alors la recherche des devises au suffixe des tickers. Si les cours
+    de change restent inaccessibles (erreur réseau après retries), les produits du lot
+    sortent sans prix, l'erreur renseignée dans produit["erreur"].
+    """
+    products = iter(products)
+    while True:
+        lot = list(islice(products, chunk_size))
+        if not lot:
+            return
+        prix_par_date, retenues = fetch_products_prices(lot, provider, **fetch_options)
+        if currency:
+            from providers import PriceFetchError  # Import différé (pandas)
+            try:
+                prix_par_date = convert_products_prices(prix_par_date, retenues, currency, provider, offline)
+            except PriceFetchError as e:
+                # Sans cours de change, aucun prix du lot n'est exprimable dans la devise
+                lot = [p if p.get("erreur") else dict(p, erreur=str(e)) for p in lot]
+                prix_par_date = {t: dict.fromkeys(table) for t, table in prix_par_date.items()}
+        calculs = compute_baskets([
+            (p["sous_jacents"], product_prices(p, prix_par_date), p["mode"]) for p in lot
+        ])
+        yield from zip(lot, calculs)
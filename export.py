@@ -0,0 +1,186 @@
+# export.py
+"""
+Export des résultats, entièrement en mémoire (BytesIO) pour l'interface : aucun fichier
+partagé sur disque, donc pas de collision entre sessions. Pour les sorties batch, des
+écrivains en flux (CSV, JSON Lines, Excel, Parquet) écrivent ligne par ligne à
+mémoire constante.
+"""
+import csv
+import io
+import json
+
+import pandas as pd
+
+# format -> (extension, type MIME)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "jsonl": ("jsonl", "application/x-ndjson"),
+}
+
+# ---------- Tables exportées ----------
+
+def observations_frame(sous_jacents, prix_panier, prix_locaux=None, devises=None, taux=None):
+    """
+    Prix bruts de constatation, une ligne par (sous-jacent, date). Pour des prix
+    convertis (voir fx.convert_prices), prix_locaux, devises et taux ajoutent à côté du
+    prix le prix en devise de cotation, cette devise et le taux de change appliqué.
+    """
+    colonnes = ["Nom Entré", "Ticker Utilisé", "Date", "Prix"]
+    if prix_locaux is not None:
+        colonnes += ["Prix local", "Devise locale", "Taux de change"]
+    lignes = []
+    for ticker, info in sous_jacents.items():
+        for i, (date, prix) in enumerate(zip(info["dates"], prix_panier[ticker])):
+            ligne = {
+                "Nom Entré": info["input_name"],
+                "Ticker Utilisé": ticker,
+                "Date": date,
+                "Prix": prix,
+            }
+            if prix_locaux is not None:
+                ligne["Prix local"] = prix_locaux[ticker][i]
+                ligne["Devise locale"] = devises[ticker]
+                ligne["Taux de change"] = taux[ticker][i]
+            lignes.append(ligne)
+    return pd.DataFrame(lignes, columns=colonnes)
+
+def typed_frame(df):
+    """Copie où les colonnes mêlant nombres et « N/A » deviennent numériques (N/A -> NaN)."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            valeurs = df[col].replace("N/A", None)
+            try:
+                df[col] = pd.to_numeric(valeurs)
+            except (ValueError, TypeError):
+                df[col] = df[col].astype(str)
+    return df
+
+# ---------- Export en mémoire ----------
+
+def to_excel_bytes(sheets):
+    """Classeur Excel {nom de feuille: DataFrame} construit en mémoire."""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as out:
+        for name, df in sheets.items():
+            df.to_excel(out, index=False, sheet_name=name)
+    return buffer.getvalue()
+
+def to_csv_bytes(df):
+    """CSV UTF-8 (avec BOM, pour une ouverture directe dans Excel)."""
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+def to_parquet_bytes(df):
+    """Parquet en mémoire (nécessite pyarrow)."""
+    buffer = io.BytesIO()
+    typed_frame(df).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+# ---------- Écriture en flux (batch) ----------
+
+class StreamWriter:
+    """Écrit des lignes (dict) une à une ; à utiliser comme gestionnaire de contexte."""
+
+    def __init__(self, out, columns):
+        self.out = out
+        self.columns = columns
+
+    def write(self, row):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvStreamWriter(StreamWriter):
+    """CSV, flush après chaque ligne."""
+
+    def __init__(self, out, columns):
+        super().__init__(out, columns)
+        self._writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self.out.flush()
+
+
+class JsonlStreamWriter(StreamWriter):
+    """JSON Lines : la ligne complète est écrite, colonnes supplémentaires comprises."""
+
+    def write(self, row):
+        self.out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+
+class ExcelStreamWriter(StreamWriter):
+    """Excel via openpyxl en mode write_only : les lignes ne sont pas gardées en mémoire."""
+
+    def __init__(self, out, columns, sheet_name="Spots"):
+        super().__init__(out, columns)
+        from openpyxl import Workbook
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(sheet_name)
+        self._ws.append(columns)
+
+    def write(self, row):
+        self._ws.append([row.get(c) for c in self.columns])
+
+    def close(self):
+        self._wb.save(self.out)
+
+
+class ParquetStreamWriter(StreamWriter):
+    """
+    Parquet par groupes de batch_size lignes (nécessite pyarrow). schema :
+    {colonne: type pyarrow ("string", "float64", "int64"...)}, pour que les colonnes
+    entièrement vides d'un groupe gardent leur type.
+    """
+
+    def __init__(self, out, columns, schema, batch_size=10_000):
+        super().__init__(out, columns)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._schema = pa.schema([(c, pa.type_for_alias(schema[c])) for c in columns])
+        self._writer = pq.ParquetWriter(out, self._schema)
+        self._batch = []
+        self.batch_size = batch_size
+
+    def write(self, row):
+        self._batch.append({c: row.get(c) for c in self.columns})
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self._writer.write_table(self._pa.Table.from_pylist(self._batch, schema=self._schema))
+            self._batch = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_stream_writer(fmt, out, columns, schema=None):
+    """
+    Écrivain en flux pour le format demandé. out est un fichier texte pour csv/jsonl,
+    un chemin ou un fichier binaire pour xlsx/parquet.
+    """
+    if fmt == "csv":
+        return CsvStreamWriter(out, columns)
+    if fmt == "jsonl":
+        return JsonlStreamWriter(out, columns)
+    if fmt == "xlsx":
+        return ExcelStreamWriter(out, columns)
+    if fmt == "parquet":
+        return ParquetStreamWriter(out, columns, schema or {c: "string" for c in columns})
+    raise ValueError(f"Format d'export inconnu : {fmt}")
@@ -0,0 +1,140 @@
+# fetching.py
+"""
+Récupération concurrente des prix de constatation par lots de sous-jacents : un seul
+appel au fournisseur par lot (un panier tient dans un lot), pool de threads borné pour
+les lots indépendants, retries avec backoff exponentiel et délai maximal par lot. Un lot
+en échec est redécoupé en sous-jacents isolés. Le débit réseau global est limité en
+amont par providers.RATE_LIMITER.
+
+Seules les erreurs de transport (PriceFetchError, OSError, dont TimeoutError) sont
+retentées : un ticker sans données n'est pas une erreur, son résultat est définitif.
+Le délai d'un lot borne aussi chaque tentative (limiteur de débit, attente d'un
+téléchargement en vol, délai réseau : voir providers.deadline).
+"""
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import METRICS
+from providers import PriceFetchError, deadline, fetch_observation_prices
+
+MAX_WORKERS = 4
+TAILLE_LOT = 50  # sous-jacents par appel au fournisseur
+MAX_TENTATIVES = 3
+BACKOFF_INITIAL = 0.5  # secondes, doublé à chaque nouvelle tentative
+TIMEOUT_SOUS_JACENT = 30  # secondes, délai maximal d'un lot, tentatives comprises
+MARGE_TIMEOUT = 5  # secondes accordées à une tentative en cours avant d'abandonner le lot
+
+ERREURS_TRANSPORT = (PriceFetchError, OSError)
+
+
+def _vide(dates):
+    """Résultat d'un sous-jacent en échec : ni prix ni date retenue."""
+    return [None] * len(dates), [None] * len(dates)
+
+
+def call_with_retry(fn, retries=MAX_TENTATIVES, backoff=BACKOFF_INITIAL, timeout=TIMEOUT_SOUS_JACENT):
+    """
+    fn() avec retries sur les erreurs de transport ; timeout borne l'ensemble des
+    tentatives, attentes des fournisseurs comprises (providers.deadline).
+    Lève la dernière erreur si toutes les tentatives échouent ou si le délai est dépassé.
+    """
+    echeance = time.monotonic() + timeout
+    delai = backoff
+    with deadline(timeout):
+        for tentative in range(retries):
+            try:
+                return fn()
+            except ERREURS_TRANSPORT:
+                if tentative == retries - 1 or time.monotonic() + delai > echeance:
+                    raise
+                METRICS.inc("spot_fetch_retries_total")
+                time.sleep(delai + random.uniform(0, delai / 2))
+                delai *= 2
+
+def fetch_with_retry(dates_by_ticker, provider, **retry):
+    """
+    Prix {ticker: ([prix ou None], [date du Close retenu ou None])} d'un lot de
+    sous-jacents, en un seul appel au fournisseur (fetch_observation_prices), avec
+    retries sur les erreurs de transport (voir call_with_retry).
+    """
+    with METRICS.timer("spot_batch_fetch_seconds"):
+        return call_with_retry(lambda: fetch_observation_prices(dates_by_ticker, provider), **retry)
+
+
+def fetch_concurrently(dates_by_ticker, provider, max_workers=MAX_WORKERS, on_done=None,
+                       batch_size=TAILLE_LOT, **retry):
+    """
+    {ticker: [dates JJ/MM/AAAA]} -> ({ticker: [prix ou None]}, {ticker: [date du Close
+    retenu ou None]}, [tickers en échec]), dans l'ordre d'entrée quel que soit l'ordre de
+    fin des tâches. Les dates retenues servent à convertir chaque prix au cours de change
+    du jour de sa clôture (voir fx.convert_prices). Les sous-jacents partent par lots de
+    batch_size, un appel au fournisseur par lot ; si un lot échoue malgré les retries,
+    ses sous-jacents sont redemandés un par un, et seul celui qui échoue encore reçoit
+    None partout et figure parmi les échecs. Un lot qui dépasse son délai (timeout, plus
+    MARGE_TIMEOUT) est abandonné sans être redécoupé. Un sous-jacent sans données (None
+    partout) n'est pas un échec : ce résultat est définitif.
+    on_done(ticker, nb_termines, total) est appelé depuis le thread appelant pour chaque
+    sous-jacent terminé (ex. pour une barre de progression). Les sous-jacents d'un même
+    lot se terminent ensemble : la progression avance par lot, et non plus sous-jacent
+    par sous-jacent ; un panier de l'application (un seul lot) passe donc d'un coup à
+    100 %.
+    """
+    if not dates_by_ticker:
+        return {}, {}, []
+    tickers = list(dates_by_ticker)
+    total = len(tickers)
+    limite = retry.get("timeout", TIMEOUT_SOUS_JACENT) + MARGE_TIMEOUT
+    resultats, echecs = {}, set()
+    en_cours = {}  # future -> (lot, {"debut": instant de démarrage})
+
+    def terminer(lot, prix):
+        for ticker in lot:
+            resultats[ticker] = prix[ticker]
+            if on_done:
+                on_done(ticker, len(resultats), total)
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, total))
+
+    def soumettre(lot):
+        demarrage = {}
+
+        def tache():
+            demarrage["debut"] = time.monotonic()
+            return fetch_with_retry({t: dates_by_ticker[t] for t in lot}, provider, **retry)
+        en_cours[pool.submit(tache)] = (lot, demarrage)
+
+    try:
+        for i in range(0, total, batch_size):
+            soumettre(tickers[i:i + batch_size])
+        while en_cours:
+            echeances = [d["debut"] + limite for _, d in en_cours.values() if "debut" in d]
+            attente = max(0.0, min(echeances) - time.monotonic()) if echeances else limite
+            termines, _ = wait(en_cours, timeout=attente, return_when=FIRST_COMPLETED)
+            for future in termines:
+                lot, _ = en_cours.pop(future)
+                try:
+                    prix = future.result()
+                except Exception:
+                    if len(lot) > 1:
+                        # Un sous-jacent fautif ne doit pas priver les autres de leurs prix
+                        METRICS.inc("spot_fetch_splits_total")
+                        for ticker in lot:
+                            soumettre([ticker])
+                        continue
+                    METRICS.inc("spot_fetch_failures_total")
+                    echecs.add(lot[0])
+                    prix = {lot[0]: _vide(dates_by_ticker[lot[0]])}
+                terminer(lot, prix)
+            maintenant = time.monotonic()
+            for future, (lot, d) in list(en_cours.items()):
+                if "debut" in d and maintenant > d["debut"] + limite and not future.done():
+                    # Tentative bloquée au-delà de son délai : le thread est laissé à lui-même
+                    del en_cours[future]
+                    METRICS.inc("spot_fetch_timeouts_total")
+                    echecs.update(lot)
+                    terminer(lot, {t: _vide(dates_by_ticker[t]) for t in lot})
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return ({t: resultats[t][0] for t in tickers}, {t: resultats[t][1] for t in tickers},
+            [t for t in tickers if t in echecs])
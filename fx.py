@@ -0,0 +1,164 @@
+# fx.py
+"""
+Conversion des prix de constatation dans une devise de référence.
+
+Les devises de cotation sont lues dans le cache persistant du fournisseur, puis
+demandées à yfinance pour les tickers restants, en parallèle et au débit commun
+(quote_currencies) ; les devises obtenues sont persistées pour les exécutions
+suivantes. Les paires de change nécessaires (« EURUSD=X »...) sont téléchargées en un
+seul appel au fournisseur de cours sur la plage des dates ; elles passent donc par les
+mêmes caches que les prix (mémoire partagée, SQLite). Chaque prix est converti au cours
+de change du jour de la clôture retenue pour lui (et non de la date de constatation,
+dont elle peut s'écarter de quelques jours), par une recherche vectorisée par devise
+avec la même règle de date la plus proche que les prix (providers.closest_closes).
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+from metrics import METRICS
+from singleflight import LRUCache
+from tickers import cached_currency, confirmed_currency, remember_currency, ticker_currency
+
+REPORTING_CURRENCIES = ("EUR", "USD", "GBP", "CHF", "JPY")
+
+MAX_WORKERS_DEVISES = 4  # recherches de devise simultanées (débit borné par RATE_LIMITER)
+TIMEOUT_DEVISES = 15  # secondes accordées à l'ensemble des recherches de devise d'un appel
+INVERSE_TTL = 24 * 3600  # secondes avant de retenter le sens direct d'une paire inverse
+INVERSES_MAX_ENTRIES = 256
+
+# Sous-unités cotées par Yahoo : code -> (devise, diviseur)
+SUBUNITS = {"GBp": ("GBP", 100), "GBX": ("GBP", 100), "ZAc": ("ZAR", 100), "ILA": ("ILS", 100)}
+
+
+def fx_ticker(base, quote):
+    """Ticker Yahoo du cours de 1 base en quote."""
+    return f"{base}{quote}=X"
+
+def base_currency(code):
+    """« GBp » -> ("GBP", 100) ; « EUR » -> ("EUR", 1)."""
+    return SUBUNITS.get(code, (code, 1))
+
+# Paires que Yahoo ne cote que dans le sens inverse, apprises au fil des appels et
+# communes aux sessions : {(base, quote): expiration monotonic}
+_inverses = LRUCache(INVERSES_MAX_ENTRIES)
+
+def _is_inverse(pair):
+    expiration = _inverses.get(pair)
+    return expiration is not None and expiration > time.monotonic()
+
+def _fetch_pairs(pairs, start, end, provider):
+    """
+    {paire: Series} en un seul appel, avec les mêmes retries que les prix
+    (fetching.call_with_retry) ; une paire absente du résultat n'est pas cotée. Lève
+    PriceFetchError si le fournisseur reste en échec : un prix sans cours de change ne
+    doit pas passer pour un prix manquant.
+    """
+    if not pairs:
+        return {}
+    from fetching import ERREURS_TRANSPORT, call_with_retry  # Import différé (pandas)
+    from providers import PriceFetchError
+
+    tickers = {pair: fx_ticker(*pair) for pair in pairs}
+    try:
+        series = call_with_retry(lambda: provider.get_closes(list(tickers.values()), start, end))
+    except ERREURS_TRANSPORT as e:
+        METRICS.inc("spot_fx_errors_total")
+        raise PriceFetchError(f"Cours de change indisponibles ({', '.join(tickers.values())}) : {e}") from e
+    return {pair: series[t.upper()] for pair, t in tickers.items() if t.upper() in series}
+
+def fx_rates(currencies, reporting, start, end, provider):
+    """
+    {devise: Series du cours de 1 unité en devise de référence} sur [start, end[.
+    Toutes les paires directes partent en un appel ; celles que Yahoo ne cote pas sont
+    redemandées dans le sens inverse, en un second appel. Une paire directe sans données
+    (et non en erreur : _fetch_pairs lève alors) dont l'inverse est coté est retenue
+    comme inverse pendant INVERSE_TTL. Une devise sans cours est absente du résultat.
+    """
+    devises = sorted(set(currencies) - {reporting, None})
+    directes = [(c, reporting) for c in devises if not _is_inverse((c, reporting))]
+    rates = {base: s for (base, _), s in _fetch_pairs(directes, start, end, provider).items()}
+    inverses = [(reporting, c) for c in devises if c not in rates]
+    for (_, c), s in _fetch_pairs(inverses, start, end, provider).items():
+        rates[c] = 1.0 / s
+        if (c, reporting) in directes:
+            _inverses.put((c, reporting), time.monotonic() + INVERSE_TTL)
+    return rates
+
+def quote_currencies(tickers, provider, offline=False, max_workers=MAX_WORKERS_DEVISES):
+    """
+    {ticker: devise de cotation ou None}. Les devises inconnues du processus sont
+    d'abord lues dans le cache du fournisseur (provider.get_currencies), puis demandées
+    à yfinance en parallèle (sauf offline) ; celles que yfinance confirme sont
+    persistées (provider.store_currencies). À défaut, la devise est déduite du suffixe,
+    y compris pour les requêtes encore sans réponse après TIMEOUT_DEVISES (le thread
+    appelant n'attend pas au-delà ; la réponse tardive reste mémoïsée par tickers.py).
+    """
+    inconnus = [t for t in dict.fromkeys(tickers) if not cached_currency(t)[0]]
+    if inconnus:
+        for t, devise in provider.get_currencies(inconnus).items():
+            remember_currency(t, devise)
+        a_demander = [t for t in inconnus if not cached_currency(t)[0]]
+        if a_demander and not offline:
+            pool = ThreadPoolExecutor(max_workers=min(max_workers, len(a_demander)))
+            try:
+                futures = {pool.submit(confirmed_currency, t): t for t in a_demander}
+                termines, _ = wait(futures, timeout=TIMEOUT_DEVISES)
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+            confirmees = {futures[f]: f.result() for f in termines}
+            provider.store_currencies({t: d for t, d in confirmees.items() if d})
+    # Plus aucune requête réseau ici : mémoire du processus, sinon suffixe
+    return {t: ticker_currency(t, offline=True) for t in tickers}
+
+def convert_prices(prix_par_ticker, dates_par_ticker, reporting, provider, offline=False):
+    """
+    Convertit {ticker: [prix ou None]} en devise de référence ; dates_par_ticker donne,
+    pour chaque prix, la date du Close retenu (Timestamp ou None, voir
+    fetching.fetch_concurrently), jour dont le cours de change est appliqué. Retourne
+    ({ticker: [prix convertis ou None]}, {ticker: devise de cotation}, {ticker: [taux
+    appliqué ou None]}), le taux valant pour 1 unité cotée (sous-unité comprise : 1 GBp
+    -> 0,01 GBP). Un prix sans cours de change, ou d'un ticker de devise inconnue,
+    devient None ; lève PriceFetchError si les cours de change restent inaccessibles.
+    """
+    from providers import FENETRE_JOURS, closest_closes  # Import différé (pandas)
+
+    devises = quote_currencies(list(prix_par_ticker), provider, offline=offline)
+    bases = {t: base_currency(c) if c else (None, 1) for t, c in devises.items()}
+
+    # Toutes les dates à la suite, puis regroupées par devise
+    tickers = list(prix_par_ticker)
+    toutes = [d for t in tickers for d in dates_par_ticker[t]]
+    valides = [d for d in toutes if d is not None]
+    if not valides:
+        return ({t: list(prix_par_ticker[t]) for t in tickers}, devises,
+                {t: [None] * len(prix_par_ticker[t]) for t in tickers})
+    fenetre = np.timedelta64(FENETRE_JOURS, "D")
+    start, end = min(valides) - fenetre, max(valides) + fenetre
+    rates = fx_rates({b for b, _ in bases.values()}, reporting, start, end, provider)
+
+    par_devise, pos = {}, 0
+    for t in tickers:
+        n = len(dates_par_ticker[t])
+        par_devise.setdefault(bases[t][0], []).append((t, slice(pos, pos + n)))
+        pos += n
+
+    convertis, appliques = {}, {}
+    for devise, groupe in par_devise.items():
+        dates = [d for _, tranche in groupe for d in toutes[tranche]]
+        if devise == reporting:
+            taux = np.ones(len(dates))
+        elif devise is None or devise not in rates:
+            taux = np.full(len(dates), np.nan)
+        else:
+            taux = np.array([np.nan if x is None else x for x in closest_closes(rates[devise], dates)])
+        i = 0
+        for t, tranche in groupe:
+            n = tranche.stop - tranche.start
+            prix = np.array([np.nan if p is None else p for p in prix_par_ticker[t]], dtype=float)
+            taux_ticker = taux[i:i + n] / bases[t][1]
+            convertis[t] = [None if np.isnan(v) else float(v) for v in prix * taux_ticker]
+            appliques[t] = [None if np.isnan(x) else float(x) for x in taux_ticker]
+            i += n
+    return {t: convertis[t] for t in tickers}, devises, {t: appliques[t] for t in tickers}
@@ -0,0 +1,139 @@
+# metrics.py
+"""
+Instrumentation du chemin critique : compteurs (requêtes réseau, hits/misses de cache,
+retries...) et chronométrages (étapes de l'application, appels aux fournisseurs).
+Le registre METRICS est commun à tout le processus et sûr entre threads ; il s'exporte
+en JSON ou au format texte Prometheus, et peut être exposé en HTTP pour le monitoring
+(start_http_server, activé dans l'application par SPOT_METRICS_PORT ; l'endpoint n'y
+démarre qu'avec la première session Streamlit).
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """Registre de compteurs et de chronométrages, indexés par (nom, étiquettes)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._timings = {}  # clé -> [nombre, total (s), max (s)]
+            self._started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        """Incrémente un compteur."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Enregistre une durée (en secondes)."""
+        key = _key(name, labels)
+        with self._lock:
+            stats = self._timings.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Chronomètre le bloc : with METRICS.timer("spot_stage_seconds", stage="fetch"): ..."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def counter(self, name, **labels):
+        """Valeur courante d'un compteur (0 s'il n'existe pas)."""
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def snapshot(self):
+        """État courant : {"counters": [...], "timings": [...], "uptime_s": ...}."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            timings = [
+                {"name": name, "labels": dict(labels), "count": n, "sum_s": total, "max_s": pic}
+                for (name, labels), (n, total, pic) in sorted(self._timings.items())
+            ]
+            uptime = time.time() - self._started
+        return {"counters": counters, "timings": timings, "uptime_s": uptime}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Format texte d'exposition Prometheus : compteurs, résumés count/sum et maxima (gauge)."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timings = sorted(self._timings.items())
+        lignes, types = [], set()
+        for (name, labels), value in counters:
+            if name not in types:
+                lignes.append(f"# TYPE {name} counter")
+                types.add(name)
+            lignes.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (n, total, _) in timings:
+            if name not in types:
+                lignes.append(f"# TYPE {name} summary")
+                types.add(name)
+            lignes.append(f"{name}_count{_format_labels(labels)} {n}")
+            lignes.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        # Les maxima forment une famille (gauge) distincte, à la suite des résumés
+        for (name, labels), (_, _, pic) in timings:
+            if f"{name}_max" not in types:
+                lignes.append(f"# TYPE {name}_max gauge")
+                types.add(f"{name}_max")
+            lignes.append(f"{name}_max{_format_labels(labels)} {pic:.6f}")
+        return "\n".join(lignes) + "\n"
+
+
+METRICS = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = METRICS.to_json(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = METRICS.to_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass  # pas de log par requête de scraping
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Expose /metrics (Prometheus) et /metrics.json sur un thread démon ; renvoie le serveur."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="spot-metrics").start()
+    return server
@@ -0,0 +1,646 @@
+# providers.py
+"""
+Fournisseurs de cours de clôture : interface commune, yfinance, cache SQLite local
+(avec mode hors-ligne), mémoire partagée entre sessions avec regroupement des
+téléchargements concurrents, et stub lu depuis un fichier pour travailler sans réseau.
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from metrics import METRICS
+from singleflight import LRUCache, SingleFlight
+
+FENETRE_JOURS = 4  # demi-fenêtre (en jours) autour de chaque date de constatation
+
+
+class PriceFetchError(Exception):
+    """Échec (a priori transitoire) de récupération des cours : l'appel peut être retenté."""
+
+
+# ---------- Échéances ----------
+
+_ECHEANCE = contextvars.ContextVar("echeance", default=None)
+
+@contextmanager
+def deadline(seconds):
+    """
+    Borne les attentes des fournisseurs appelés dans le bloc (limiteur de débit,
+    téléchargement en vol d'une autre session, délai réseau de yfinance) à seconds
+    secondes à partir de maintenant. Propre au thread courant.
+    """
+    token = _ECHEANCE.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _ECHEANCE.reset(token)
+
+def remaining_time():
+    """Secondes restantes avant l'échéance courante (None si aucune, 0 si dépassée)."""
+    echeance = _ECHEANCE.get()
+    return None if echeance is None else max(0.0, echeance - time.monotonic())
+
+
+# ---------- Fournisseurs ----------
+
+class PriceProvider:
+    """
+    Interface commune : Close journaliers de plusieurs tickers sur [start, end[, et
+    stockage facultatif des devises de cotation (seul CachedProvider les persiste).
+    """
+
+    def get_closes(self, tickers, start, end):
+        """Retourne {TICKER: Series des Close triée par date, sans NaN}. Lève en cas d'échec."""
+        raise NotImplementedError
+
+    def get_currencies(self, tickers):
+        """Devises connues {TICKER: devise} parmi tickers ({} si rien n'est stocké)."""
+        return {}
+
+    def store_currencies(self, devises):
+        """Mémorise {TICKER: devise confirmée} ; sans effet par défaut."""
+
+
+# Erreurs de yf.download dues au transport (à retenter), par opposition à « pas de données »
+_ERREURS_TRANSPORT = re.compile(
+    r"RateLimit|Too Many Requests|Timeout|timed out|Connection|SSL|HTTPError|curl|resolve host",
+    re.IGNORECASE,
+)
+
+
+class _YFinanceErrors(logging.Handler):
+    """
+    Erreurs que yf.download journalise au lieu de les lever, pour le seul thread
+    appelant (les téléchargements des autres sessions ne s'y mêlent pas).
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.thread = threading.get_ident()
+        self.messages = []
+
+    def emit(self, record):
+        if record.thread == self.thread:
+            self.messages.append(record.getMessage())
+
+
+class YFinanceProvider(PriceProvider):
+    """
+    Téléchargement direct via yfinance, en un seul appel multi-tickers.
+    yf.download absorbe les erreurs et se contente de les journaliser : une erreur de
+    transport (réseau, délai, limite de débit) est donc relevée dans son journal et
+    signalée par PriceFetchError pour pouvoir être retentée. Un ticker inconnu ou une
+    plage sans cotation est simplement absent du résultat, qui est définitif.
+    """
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+
+    def get_closes(self, tickers, start, end):
+        import yfinance as yf  # Import différé : inutile hors-ligne ou avec le stub fichier
+
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        if not tickers:
+            return {}
+        restant = remaining_time()
+        timeout = self.timeout if restant is None else max(1.0, min(self.timeout, restant))
+        METRICS.inc("spot_network_requests_total", source="yf_download")
+        erreurs = _YFinanceErrors()
+        journal = logging.getLogger("yfinance")
+        journal.addHandler(erreurs)
+        try:
+            with METRICS.timer("spot_provider_call_seconds", provider="yfinance"):
+                data = yf.download(tickers, start=start, end=end, progress=False, group_by="column",
+                                   threads=len(tickers) > 1, timeout=timeout)
+        except Exception as e:
+            METRICS.inc("spot_network_errors_total", source="yf_download")
+            raise PriceFetchError(f"Échec du téléchargement de {', '.join(tickers)} : {e}") from e
+        finally:
+            journal.removeHandler(erreurs)
+        transport = [m for m in erreurs.messages if _ERREURS_TRANSPORT.search(m)]
+        if transport:
+            METRICS.inc("spot_network_errors_total", source="yf_download")
+            raise PriceFetchError("; ".join(transport))
+        if data is None or data.empty:
+            return {}
+        if data.index.tz is not None:
+            data.index = data.index.tz_localize(None)
+        if isinstance(data.columns, pd.MultiIndex):
+            closes = data["Close"]
+        else:
+            closes = data[["Close"]].rename(columns={"Close": tickers[0]})
+        series = {}
+        for ticker in tickers:
+            if ticker in closes.columns:
+                s = closes[ticker].dropna().sort_index()
+                if not s.empty:
+                    series[ticker] = s
+        return series
+
+
+class RateLimiter:
+    """Limiteur de débit (seau à jetons) partagé entre threads : rate requêtes/s, rafale burst."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Bloque jusqu'à ce qu'une requête soit autorisée. Retourne False, sans consommer
+        de jeton, si l'autorisation n'arrive pas dans les timeout secondes.
+        """
+        t0 = time.perf_counter()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    METRICS.observe("spot_rate_limiter_wait_seconds", time.perf_counter() - t0)
+                    return True
+                attente = (1 - self._tokens) / self.rate
+            if timeout is not None and time.perf_counter() - t0 + attente > timeout:
+                METRICS.inc("spot_rate_limiter_timeouts_total")
+                return False
+            time.sleep(attente)
+
+
+# Débit maximal vers Yahoo Finance, commun à tout le processus (toutes sessions confondues)
+RATE_LIMITER = RateLimiter(rate=2.0, burst=4)
+
+
+class RateLimitedProvider(PriceProvider):
+    """
+    Fait passer chaque appel au fournisseur amont par un RateLimiter, dans la limite
+    de l'échéance courante (voir deadline) : PriceFetchError si elle est dépassée.
+    """
+
+    def __init__(self, upstream, limiter=RATE_LIMITER):
+        self.upstream = upstream
+        self.limiter = limiter
+
+    def get_closes(self, tickers, start, end):
+        if not self.limiter.acquire(timeout=remaining_time()):
+            raise PriceFetchError("Délai dépassé en attente du limiteur de débit")
+        return self.upstream.get_closes(tickers, start, end)
+
+    def get_currencies(self, tickers):
+        return self.upstream.get_currencies(tickers)
+
+    def store_currencies(self, devises):
+        self.upstream.store_currencies(devises)
+
+
+class FileProvider(PriceProvider):
+    """
+    Stub hors-réseau : sert des Close enregistrés dans un fichier, soit un CSV
+    (colonnes date,ticker,close), soit un JSON {ticker: {"AAAA-MM-JJ": close}}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._series = load_closes_file(path)
+
+    def get_closes(self, tickers, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        series = {}
+        with METRICS.timer("spot_provider_call_seconds", provider="file"):
+            for ticker in dict.fromkeys(t.upper() for t in tickers):
+                s = self._series.get(ticker)
+                if s is None:
+                    continue
+                s = s[(s.index >= start) & (s.index < end)]
+                if not s.empty:
+                    series[ticker] = s
+        return series
+
+
+class RecordingProvider(PriceProvider):
+    """
+    Enregistre tout ce que renvoie le fournisseur amont, pour constituer un fichier
+    rejouable par FileProvider (voir save_closes_file).
+    """
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.recorded = {}
+
+    def get_closes(self, tickers, start, end):
+        series = self.upstream.get_closes(tickers, start, end)
+        for ticker, s in series.items():
+            deja = self.recorded.get(ticker)
+            s = s if deja is None else pd.concat([deja, s])
+            self.recorded[ticker] = s[~s.index.duplicated(keep="last")].sort_index()
+        return series
+
+    def get_currencies(self, tickers):
+        return self.upstream.get_currencies(tickers)
+
+    def store_currencies(self, devises):
+        self.upstream.store_currencies(devises)
+
+
+class CachedProvider(PriceProvider):
+    """
+    Cache SQLite des Close devant un autre fournisseur, clé (ticker, jour calendaire).
+    Les jours sans cotation sont mémorisés (close NULL) pour ne pas être redemandés,
+    y compris pour un ticker dont l'amont n'a renvoyé aucun cours (ticker inconnu,
+    plage future) : ce résultat négatif expire après negative_ttl secondes.
+    Les dates passées sont conservées indéfiniment ; seules les dates des recent_days
+    derniers jours expirent après ttl secondes. Au-delà de max_rows lignes, les lignes
+    les moins récemment lues sont évincées. En mode offline, seul le cache répond.
+    Si l'amont échoue, les lignes expirées sont servies telles quelles ; l'erreur n'est
+    propagée que s'il manque des jours jamais mis en cache.
+    Les devises de cotation confirmées sont conservées dans la même base (table
+    currencies) et expirent après currency_ttl secondes, sauf en mode offline.
+    """
+
+    def __init__(self, upstream, path="prices_cache.sqlite", ttl=3600, recent_days=7,
+                 max_rows=500_000, offline=False, negative_ttl=3600, currency_ttl=30 * 24 * 3600):
+        self.upstream = upstream
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.currency_ttl = currency_ttl
+        self.recent_days = recent_days
+        self.max_rows = max_rows
+        self.offline = offline
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS closes ("
+                    " ticker TEXT NOT NULL, day TEXT NOT NULL, close REAL,"
+                    " fetched_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                    " PRIMARY KEY (ticker, day))"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS closes_accessed ON closes (accessed_at)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS currencies ("
+                    " ticker TEXT PRIMARY KEY, currency TEXT NOT NULL, fetched_at REAL NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Une connexion par opération : sûr vis-à-vis des threads de Streamlit
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _read(self, tickers, first_day, last_day):
+        """{TICKER: {jour: (close, fetched_at)}} pour les jours de [first_day, last_day]."""
+        conn = self._connect()
+        try:
+            with conn:
+                rows = {}
+                for ticker in tickers:
+                    cur = conn.execute(
+                        "SELECT day, close, fetched_at FROM closes"
+                        " WHERE ticker = ? AND day BETWEEN ? AND ?",
+                        (ticker, first_day, last_day),
+                    )
+                    rows[ticker] = {day: (close, fetched_at) for day, close, fetched_at in cur}
+                    conn.execute(
+                        "UPDATE closes SET accessed_at = ? WHERE ticker = ? AND day BETWEEN ? AND ?",
+                        (time.time(), ticker, first_day, last_day),
+                    )
+                return rows
+        finally:
+            conn.close()
+
+    def _store(self, series, tickers, start, end, fetched_at):
+        """
+        Enregistre chaque jour calendaire de [start, end[ pour les tickers demandés ; un
+        ticker absent de series n'a que des jours NULL (résultat négatif).
+        """
+        days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end), inclusive="left")
+        keys = [d.strftime("%Y-%m-%d") for d in days]
+        conn = self._connect()
+        try:
+            with conn:
+                for ticker in tickers:
+                    s = series.get(ticker)
+                    par_jour = {} if s is None else {d.strftime("%Y-%m-%d"): float(v) for d, v in s.items()}
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO closes VALUES (?, ?, ?, ?, ?)",
+                        [(ticker, k, par_jour.get(k), fetched_at, fetched_at) for k in keys],
+                    )
+                (count,) = conn.execute("SELECT COUNT(*) FROM closes").fetchone()
+                if count > self.max_rows:
+                    conn.execute(
+                        "DELETE FROM closes WHERE rowid IN"
+                        " (SELECT rowid FROM closes ORDER BY accessed_at LIMIT ?)",
+                        (count - self.max_rows,),
+                    )
+        finally:
+            conn.close()
+
+    def get_currencies(self, tickers):
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        if not tickers:
+            return {}
+        limite = 0 if self.offline else time.time() - self.currency_ttl
+        conn = self._connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    "SELECT ticker, currency FROM currencies WHERE fetched_at >= ? AND ticker IN"
+                    f" ({', '.join('?' * len(tickers))})",
+                    (limite, *tickers),
+                )
+                return dict(cur)
+        finally:
+            conn.close()
+
+    def store_currencies(self, devises):
+        if not devises:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO currencies VALUES (?, ?, ?)",
+                    [(t.upper(), d, now) for t, d in devises.items()],
+                )
+        finally:
+            conn.close()
+
+    def _is_stale(self, day, fetched_at, now):
+        recent = pd.Timestamp.today().normalize() - pd.Timedelta(days=self.recent_days)
+        return day >= recent and now - fetched_at > self.ttl
+
+    def get_closes(self, tickers, start, end):
+        with METRICS.timer("spot_provider_call_seconds", provider="cache"):
+            return self._get_closes(tickers, start, end)
+
+    def _get_closes(self, tickers, start, end):
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end), inclusive="left")
+        if not tickers or days.empty:
+            return {}
+        keys = [d.strftime("%Y-%m-%d") for d in days]
+        now = time.time()
+        cached = self._read(tickers, keys[0], keys[-1])
+
+        # Jours absents ou expirés, par ticker (une plage sans aucun cours est un résultat
+        # négatif, qui expire après negative_ttl)
+        manquants = {}
+        for ticker in tickers:
+            rows = cached[ticker]
+            negatif = bool(rows) and all(close is None for close, _ in rows.values())
+            jours = [d for d, k in zip(days, keys)
+                     if k not in rows or self._is_stale(d, rows[k][1], now)
+                     or (negatif and now - rows[k][1] > self.negative_ttl)]
+            if jours:
+                manquants[ticker] = jours
+            METRICS.inc("spot_price_cache_total", result="miss" if jours else "hit")
+
+        if manquants and not self.offline:
+            debut = min(j[0] for j in manquants.values())
+            fin = max(j[-1] for j in manquants.values()) + pd.Timedelta(days=1)
+            try:
+                frais = self.upstream.get_closes(list(manquants), debut, fin)
+            except Exception:
+                # Réseau indisponible : on sert le cache, même expiré, s'il couvre la demande
+                if any(d.strftime("%Y-%m-%d") not in cached[t] for t, j in manquants.items() for d in j):
+                    raise
+                METRICS.inc("spot_price_cache_total", result="stale_served")
+            else:
+                self._store(frais, list(manquants), debut, fin, now)
+                cached = self._read(tickers, keys[0], keys[-1])
+
+        series = {}
+        for ticker in tickers:
+            points = {pd.Timestamp(k): v[0] for k, v in cached[ticker].items() if v[0] is not None}
+            if points:
+                series[ticker] = pd.Series(points, dtype=float).sort_index()
+        return series
+
+
+class SharedPriceStore(PriceProvider):
+    """
+    Mémoire partagée par toutes les sessions du processus, devant un autre fournisseur,
+    clé ticker : chaque entrée garde la série d'une plage [début, fin[ et sert par
+    découpage toute demande incluse dans cette plage, quel que soit l'échéancier qui l'a
+    remplie. Une demande qui en déborde élargit la plage à l'union des deux. Les
+    demandes concurrentes d'un même ticker attendent le téléchargement déjà en vol
+    (single-flight), puis revérifient la couverture ; les tickers manquants d'une
+    demande partent en un seul appel amont. Un ticker sans aucun cours est mémorisé
+    (série vide). La mémoire est bornée à max_points cours (éviction LRU) ; comme dans
+    CachedProvider, seules les plages touchant les recent_days derniers jours expirent
+    (après ttl secondes), de même que les séries vides.
+    """
+
+    def __init__(self, upstream, max_points=1_000_000, ttl=300, recent_days=7):
+        self.upstream = upstream
+        self.ttl = ttl
+        self.recent_days = recent_days
+        # ticker -> (début, fin, série, expiration ou None)
+        self._cache = LRUCache(max_points, weigh=lambda entry: len(entry[2]) + 1)
+        self._flight = SingleFlight("prices")
+
+    def _expiry(self, end, serie, now):
+        recent = pd.Timestamp.today().normalize() - pd.Timedelta(days=self.recent_days)
+        return now + self.ttl if end > recent or serie.empty else None
+
+    def _fresh(self, ticker, now):
+        entry = self._cache.get(ticker)
+        if entry is not None and (entry[3] is None or entry[3] > now):
+            return entry
+        return None
+
+    @staticmethod
+    def _covers(entry, start, end):
+        return entry is not None and entry[0] <= start and entry[1] >= end
+
+    @staticmethod
+    def _slice(entry, start, end):
+        serie = entry[2]
+        return serie.iloc[serie.index.searchsorted(start):serie.index.searchsorted(end)]
+
+    def get_closes(self, tickers, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        series = {}
+        restants = list(dict.fromkeys(t.upper() for t in tickers))
+        premier_passage = True
+        while restants:
+            now = time.monotonic()
+            manquants = []
+            for ticker in restants:
+                entry = self._fresh(ticker, now)
+                if self._covers(entry, start, end):
+                    series[ticker] = self._slice(entry, start, end)
+                else:
+                    manquants.append(ticker)
+            if premier_passage:
+                METRICS.inc("spot_shared_store_total", len(restants) - len(manquants), result="hit")
+                METRICS.inc("spot_shared_store_total", len(manquants), result="miss")
+                premier_passage = False
+            if not manquants:
+                break
+
+            owned, pending = self._flight.claim(manquants)
+            # Un téléchargement a pu se terminer entre la lecture du cache et la réservation
+            for ticker in list(owned):
+                entry = self._fresh(ticker, now)
+                if self._covers(entry, start, end):
+                    series[ticker] = self._slice(entry, start, end)
+                    self._flight.resolve(ticker)
+                    owned.remove(ticker)
+            if owned:
+                self._fetch(owned, start, end, now, series)
+            # Le téléchargement attendu couvrait peut-être une autre plage : on revérifie
+            for call in pending.values():
+                call.wait(timeout=remaining_time())
+            restants = list(pending)
+        return {t: s for t, s in series.items() if not s.empty}
+
+    def _fetch(self, owned, start, end, now, series):
+        """Télécharge les tickers réservés en un appel, sur l'union de leurs plages connues."""
+        debut, fin = start, end
+        for ticker in owned:
+            entry = self._fresh(ticker, now)
+            if entry is not None:
+                debut, fin = min(debut, entry[0]), max(fin, entry[1])
+        try:
+            frais = self.upstream.get_closes(owned, debut, fin)
+        except BaseException as e:
+            for ticker in owned:
+                self._flight.resolve(ticker, error=e)
+            raise
+        for ticker in owned:
+            serie = frais.get(ticker)
+            if serie is None:
+                serie = pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+            entry = (debut, fin, serie, self._expiry(fin, serie, now))
+            self._cache.put(ticker, entry)
+            series[ticker] = self._slice(entry, start, end)
+            self._flight.resolve(ticker)
+
+    def get_currencies(self, tickers):
+        return self.upstream.get_currencies(tickers)
+
+    def store_currencies(self, devises):
+        self.upstream.store_currencies(devises)
+
+
+def load_closes_file(path):
+    """Lit un fichier de Close (CSV date,ticker,close ou JSON) -> {TICKER: Series}."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        return {
+            ticker.upper(): pd.Series({pd.Timestamp(d): float(v) for d, v in closes.items()},
+                                      dtype=float).sort_index()
+            for ticker, closes in raw.items()
+        }
+    df = pd.read_csv(path, parse_dates=["date"])
+    return {
+        str(ticker).upper(): group.set_index("date")["close"].astype(float).dropna().sort_index()
+        for ticker, group in df.groupby("ticker")
+    }
+
+
+def save_closes_file(series, path):
+    """Écrit {TICKER: Series des Close} au format lu par load_closes_file (CSV ou JSON)."""
+    if path.lower().endswith(".json"):
+        raw = {t: {d.strftime("%Y-%m-%d"): float(v) for d, v in s.items()} for t, s in series.items()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        return
+    frames = [
+        pd.DataFrame({"date": s.index.strftime("%Y-%m-%d"), "ticker": t, "close": s.values})
+        for t, s in series.items()
+    ]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["date", "ticker", "close"])
+    df.to_csv(path, index=False)
+
+
+def make_provider(offline=False, price_file=None, cache_path=None):
+    """
+    Fournisseur par défaut de l'application : mémoire partagée (single-flight) devant
+    le cache SQLite, lui-même devant yfinance, ou devant le stub fichier si
+    SPOT_PRICE_FILE (ou price_file) est renseigné.
+    """
+    price_file = price_file or os.environ.get("SPOT_PRICE_FILE")
+    cache_path = cache_path or os.environ.get("SPOT_CACHE_PATH", "prices_cache.sqlite")
+    upstream = FileProvider(price_file) if price_file else RateLimitedProvider(YFinanceProvider())
+    return SharedPriceStore(CachedProvider(upstream, path=cache_path, offline=offline))
+
+
+# ---------- Recherche des prix de constatation ----------
+
+def parse_dates(date_strs):
+    """
+    Convertit des dates JJ/MM/AAAA en un seul appel à pandas. Retourne une liste de
+    Timestamp (None si invalide).
+    """
+    textes = pd.Series(list(date_strs), dtype=object).astype(str).str.strip()
+    parsed = pd.to_datetime(textes, format="%d/%m/%Y", errors="coerce")
+    return [None if pd.isna(d) else d for d in parsed]
+
+def closest_points(series, dates):
+    """
+    Associe à chaque date (datetime ou None) le Close le plus proche dans series, en une
+    seule recherche vectorisée (searchsorted). Même règle que l'ancien appel par date :
+    seuls les cours de [date - 4j, date + 4j[ sont candidats, et en cas d'égalité
+    d'écart la date antérieure l'emporte. Retourne ([prix ou None], [date du Close
+    retenu (Timestamp) ou None]).
+    """
+    prix, retenues = [None] * len(dates), [None] * len(dates)
+    valides = [i for i, d in enumerate(dates) if d is not None]
+    if series is None or series.empty or not valides:
+        return prix, retenues
+    index = series.index.values.astype("datetime64[ns]")
+    cibles = np.array([dates[i] for i in valides], dtype="datetime64[ns]")
+    pos = np.searchsorted(index, cibles, side="left")
+    avant = np.clip(pos - 1, 0, len(index) - 1)
+    apres = np.clip(pos, 0, len(index) - 1)
+    choix = np.where(np.abs(index[apres] - cibles) < np.abs(cibles - index[avant]), apres, avant)
+    jours = index[choix]
+    fenetre = np.timedelta64(FENETRE_JOURS, "D")
+    dans_fenetre = (jours >= cibles - fenetre) & (jours < cibles + fenetre)
+    valeurs = series.values[choix]
+    for i, ok, v, jour in zip(valides, dans_fenetre, valeurs, jours):
+        if ok:
+            prix[i], retenues[i] = float(v), pd.Timestamp(jour)
+    return prix, retenues
+
+def closest_closes(series, dates):
+    """Prix [prix ou None] des Close les plus proches de chaque date (voir closest_points)."""
+    return closest_points(series, dates)[0]
+
+def fetch_observation_prices(dates_by_ticker, provider):
+    """
+    {ticker: [dates JJ/MM/AAAA]} -> {ticker: ([prix ou None], [date du Close retenu ou None])}.
+    Toutes les dates du panier sont converties en un seul appel (parse_dates), puis un
+    seul appel au fournisseur couvre la plage min -> max des dates. Les erreurs du
+    fournisseur sont propagées (fetching.fetch_concurrently gère retries et échecs).
+    """
+    toutes_dates = parse_dates(d for dates in dates_by_ticker.values() for d in dates)
+    parsed, pos = {}, 0
+    for t, dates in dates_by_ticker.items():
+        parsed[t] = toutes_dates[pos:pos + len(dates)]
+        pos += len(dates)
+    toutes = [d for d in toutes_dates if d is not None]
+    if not toutes:
+        return {t: ([None] * len(dates), [None] * len(dates)) for t, dates in parsed.items()}
+    start = min(toutes) - timedelta(days=FENETRE_JOURS)
+    end = max(toutes) + timedelta(days=FENETRE_JOURS)
+    series = provider.get_closes(parsed.keys(), start, end)
+    return {t: closest_points(series.get(t.upper()), dates) for t, dates in parsed.items()}
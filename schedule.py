@@ -0,0 +1,249 @@
+# schedule.py
+"""
+Génération de calendriers de constatation à partir de règles (« tous les jours ouvrés »,
+« fins de mois », « trimestriel du X au Y »...) et de conventions de décalage.
+
+Les jours de cotation de chaque place sont précalculés une fois pour toutes dans un
+index trié (TradingCalendar) ; décaler une date générée vers un jour ouvré est alors
+une recherche vectorisée (searchsorted) dans cet index. Les jours fériés sont ceux des
+règles pandas (fêtes fixes, Pâques, lundis flottants) ; les fermetures exceptionnelles
+ne sont pas connues, et le prix retenu reste de toute façon le Close le plus proche
+(providers.closest_closes).
+
+Syntaxe d'une règle, à la place d'une date dans la liste :
+
+    <fréquence> <début JJ/MM/AAAA> <fin JJ/MM/AAAA> [convention]
+    ex. « trimestriel 15/01/2024 15/01/2026 suivant-modifie »
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    MO, AbstractHolidayCalendar, DateOffset, EasterMonday, GoodFriday, Holiday, USLaborDay,
+    USMartinLutherKingJr, USMemorialDay, USPresidentsDay, USThanksgivingDay,
+    nearest_workday, next_monday, next_monday_or_tuesday, sunday_to_monday,
+)
+
+from engine import is_rule
+from providers import parse_dates
+
+DEBUT_INDEX = "1980-01-01"
+FIN_INDEX = "2060-12-31"
+
+# ---------- Jours fériés par place ----------
+
+class NYSEHolidays(AbstractHolidayCalendar):
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr, USPresidentsDay, GoodFriday, USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay, USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+class EuronextHolidays(AbstractHolidayCalendar):
+    rules = [
+        Holiday("Jour de l'an", month=1, day=1), GoodFriday, EasterMonday,
+        Holiday("Fête du travail", month=5, day=1),
+        Holiday("Noël", month=12, day=25), Holiday("Lendemain de Noël", month=12, day=26),
+    ]
+
+
+class XetraHolidays(AbstractHolidayCalendar):
+    rules = EuronextHolidays.rules + [
+        Holiday("Veille de Noël", month=12, day=24),
+        Holiday("Saint-Sylvestre", month=12, day=31),
+    ]
+
+
+class LSEHolidays(AbstractHolidayCalendar):
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=next_monday),
+        GoodFriday, EasterMonday,
+        Holiday("Early May", month=5, day=1, offset=DateOffset(weekday=MO(1))),
+        Holiday("Spring", month=5, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("Summer", month=8, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("Christmas", month=12, day=25, observance=next_monday),
+        Holiday("Boxing Day", month=12, day=26, observance=next_monday_or_tuesday),
+    ]
+
+
+# place -> règles de jours fériés (None : tous les jours de semaine sont ouvrés)
+EXCHANGE_HOLIDAYS = {
+    "XNYS": NYSEHolidays,
+    "XPAR": EuronextHolidays,
+    "XETR": XetraHolidays,
+    "XLON": LSEHolidays,
+    "WEEKDAYS": None,
+}
+
+# Suffixe Yahoo Finance -> place (un ticker sans suffixe est coté aux États-Unis)
+SUFFIX_EXCHANGES = {
+    "": "XNYS", "PA": "XPAR", "AS": "XPAR", "BR": "XPAR", "LS": "XPAR",
+    "DE": "XETR", "F": "XETR", "L": "XLON",
+}
+INDEX_EXCHANGES = {
+    "^GSPC": "XNYS", "^DJI": "XNYS", "^IXIC": "XNYS",
+    "^FCHI": "XPAR", "^STOXX50E": "XPAR", "^GDAXI": "XETR", "^FTSE": "XLON",
+}
+
+def exchange_for_ticker(ticker):
+    """Place de cotation déduite du ticker (suffixe Yahoo), WEEKDAYS si inconnue."""
+    ticker = (ticker or "").strip().upper()
+    if ticker.startswith("^"):
+        return INDEX_EXCHANGES.get(ticker, "WEEKDAYS")
+    suffixe = ticker.rsplit(".", 1)[1] if "." in ticker else ""
+    return SUFFIX_EXCHANGES.get(suffixe, "WEEKDAYS")
+
+# ---------- Index des jours de cotation ----------
+
+class TradingCalendar:
+    """Jours de cotation d'une place, triés (datetime64[D]) ; opérations vectorisées."""
+
+    def __init__(self, days):
+        self.days = np.unique(np.asarray(days, dtype="datetime64[D]"))
+
+    def _check(self, dates):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        if dates.size and (dates.min() < self.days[0] or dates.max() > self.days[-1]):
+            raise ValueError(f"Date hors de l'index du calendrier ({self.days[0]} -> {self.days[-1]})")
+        return dates
+
+    def is_trading_day(self, dates):
+        dates = self._check(dates)
+        pos = np.searchsorted(self.days, dates).clip(max=len(self.days) - 1)
+        return self.days[pos] == dates
+
+    def between(self, start, end):
+        """Jours de cotation de [start, end]."""
+        start, end = self._check([start, end])
+        return self.days[np.searchsorted(self.days, start, "left"):np.searchsorted(self.days, end, "right")]
+
+    def adjust(self, dates, convention):
+        """Décale chaque date non ouvrée selon la convention (voir CONVENTIONS)."""
+        dates = self._check(dates)
+        convention = normalize_convention(convention)
+        if convention == "none":
+            return dates
+        n = len(self.days)
+        suivant = self.days[np.searchsorted(self.days, dates, "left").clip(max=n - 1)]
+        precedent = self.days[(np.searchsorted(self.days, dates, "right") - 1).clip(min=0)]
+        mois = dates.astype("datetime64[M]")
+        if convention == "following":
+            return suivant
+        if convention == "preceding":
+            return precedent
+        if convention == "modified_following":
+            return np.where(suivant.astype("datetime64[M]") != mois, precedent, suivant)
+        return np.where(precedent.astype("datetime64[M]") != mois, suivant, precedent)
+
+
+@lru_cache(maxsize=None)
+def trading_calendar(exchange):
+    """Index des jours de cotation de la place, calculé une seule fois par processus."""
+    if exchange not in EXCHANGE_HOLIDAYS:
+        raise ValueError(f"Place de cotation inconnue : {exchange}")
+    regles = EXCHANGE_HOLIDAYS[exchange]
+    feries = [] if regles is None else regles().holidays(DEBUT_INDEX, FIN_INDEX).values.astype("datetime64[D]")
+    jours = np.arange(np.datetime64(DEBUT_INDEX), np.datetime64(FIN_INDEX) + 1)
+    return TradingCalendar(jours[np.is_busday(jours, holidays=feries)])
+
+# ---------- Règles de génération ----------
+
+# Libellé accepté -> (type, pas) ; "mois" : pas en mois à partir de la date de début
+FREQUENCIES = {
+    "quotidien": ("jours_ouvres", 1), "daily": ("jours_ouvres", 1),
+    "hebdomadaire": ("jours", 7), "weekly": ("jours", 7),
+    "mensuel": ("mois", 1), "monthly": ("mois", 1),
+    "fin-de-mois": ("fin_de_mois", 1), "month-end": ("fin_de_mois", 1),
+    "trimestriel": ("mois", 3), "quarterly": ("mois", 3),
+    "semestriel": ("mois", 6), "semiannual": ("mois", 6),
+    "annuel": ("mois", 12), "annual": ("mois", 12),
+}
+
+# Libellé accepté -> convention de décalage des jours non ouvrés
+CONVENTIONS = {
+    "suivant": "following", "following": "following",
+    "suivant-modifie": "modified_following", "modified-following": "modified_following",
+    "precedent": "preceding", "preceding": "preceding",
+    "precedent-modifie": "modified_preceding", "modified-preceding": "modified_preceding",
+    "aucun": "none", "none": "none",
+}
+DEFAULT_CONVENTION = "modified_following"
+
+def _label(text):
+    """« Suivant modifié » / « modified_following » -> « suivant-modifie » / « modified-following »."""
+    text = (text or "").strip().lower().replace("é", "e").replace("è", "e")
+    return re.sub(r"[\s_]+", "-", text)
+
+def normalize_convention(convention):
+    """Nom canonique de la convention (DEFAULT_CONVENTION si non précisée)."""
+    if not convention:
+        return DEFAULT_CONVENTION
+    if convention in CONVENTIONS.values():
+        return convention
+    try:
+        return CONVENTIONS[_label(convention)]
+    except KeyError:
+        raise ValueError(f"Convention de décalage inconnue : {convention}") from None
+
+def generate_schedule(start, end, frequency, convention=None, exchange="WEEKDAYS"):
+    """
+    Dates de constatation de start à end (inclus) selon la fréquence, décalées sur les
+    jours de cotation de la place. Retourne un DatetimeIndex trié, sans doublon.
+    Les échéances mensuelles gardent le jour de start (rabattu en fin de mois si besoin).
+    """
+    try:
+        genre, pas = FREQUENCIES[_label(frequency)]
+    except KeyError:
+        raise ValueError(f"Fréquence inconnue : {frequency}") from None
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    if end < start:
+        raise ValueError("La date de fin précède la date de début")
+    calendrier = trading_calendar(exchange)
+
+    if genre == "jours_ouvres":
+        return pd.DatetimeIndex(calendrier.between(start, end))
+    if genre == "jours":
+        brutes = pd.date_range(start, end, freq=f"{pas}D")
+    elif genre == "fin_de_mois":
+        brutes = pd.date_range(start, end, freq=pd.offsets.MonthEnd())
+    else:
+        # Décalage calculé depuis start à chaque échéance : pas de dérive 31/01 -> 28/02 -> 28/03
+        nb = (end.year - start.year) * 12 + end.month - start.month
+        brutes = pd.DatetimeIndex([start + DateOffset(months=k) for k in range(0, nb + 1, pas)])
+        brutes = brutes[brutes <= end]
+    return pd.DatetimeIndex(np.unique(calendrier.adjust(brutes.values, convention)))
+
+# ---------- Lignes de dates saisies ----------
+
+_MOTS_IGNORES = {"du", "au", "de", "a", "à", "from", "to"}
+
+def parse_rule(line):
+    """« trimestriel 15/01/2024 15/01/2026 [convention] » -> (fréquence, début, fin, convention)."""
+    mots = [m for m in re.split(r"[\s,;]+", line.strip()) if m.lower() not in _MOTS_IGNORES]
+    if len(mots) not in (3, 4):
+        raise ValueError(f"Règle invalide : « {line.strip()} » (attendu : fréquence début fin [convention])")
+    debut, fin = parse_dates(mots[1:3])
+    if debut is None or fin is None:
+        raise ValueError(f"Dates invalides dans la règle « {line.strip()} » (format JJ/MM/AAAA)")
+    return mots[0], debut, fin, mots[3] if len(mots) == 4 else None
+
+def expand_dates(lines, ticker=None):
+    """
+    Remplace chaque règle de la liste par les dates qu'elle génère (JJ/MM/AAAA), sur le
+    calendrier de la place du ticker ; les dates saisies telles quelles sont conservées.
+    """
+    exchange = exchange_for_ticker(ticker)
+    dates = []
+    for line in lines:
+        if is_rule(line):
+            frequence, debut, fin, convention = parse_rule(line)
+            dates.extend(generate_schedule(debut, fin, frequence, convention, exchange).strftime("%d/%m/%Y"))
+        elif line.strip():
+            dates.append(line.strip())
+    return dates
@@ -0,0 +1,125 @@
+# singleflight.py
+"""
+Primitives partagées par toutes les sessions d'un processus (Streamlit exécute chaque
+session dans son propre thread) : regroupement des appels concurrents identiques
+(SingleFlight) et cache LRU borné (LRUCache), sûrs entre threads. Module léger,
+importable au démarrage.
+"""
+import threading
+from collections import OrderedDict
+
+from metrics import METRICS
+
+
+class _Call:
+    """Appel en vol : résultat (ou exception) attendu par les autres threads."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        """Résultat de l'appel ; TimeoutError s'il n'est pas terminé dans les timeout secondes."""
+        if not self.done.wait(timeout):
+            METRICS.inc("spot_singleflight_timeouts_total")
+            raise TimeoutError("Délai dépassé en attente d'un appel en vol")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Au plus un appel en vol par clé : les appelants concurrents de même clé attendent
+    son résultat (ou reçoivent son exception) au lieu de refaire le travail.
+    Compteur spot_singleflight_total{store=name, result=leader|coalesced}.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def claim(self, keys):
+        """
+        Réserve les clés sans appel en vol. Retourne (clés réservées, {clé: appel en vol
+        d'un autre thread}) ; chaque clé réservée doit ensuite être publiée par resolve().
+        """
+        owned, pending = [], {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    self._calls[key] = _Call()
+                    owned.append(key)
+                else:
+                    pending[key] = call
+        METRICS.inc("spot_singleflight_total", len(owned), store=self.name, result="leader")
+        METRICS.inc("spot_singleflight_total", len(pending), store=self.name, result="coalesced")
+        return owned, pending
+
+    def resolve(self, key, result=None, error=None):
+        """Publie le résultat (ou l'erreur) d'une clé réservée et réveille les threads en attente."""
+        with self._lock:
+            call = self._calls.pop(key)
+        call.result, call.error = result, error
+        call.done.set()
+
+    def do(self, key, fn, timeout=None):
+        """
+        Exécute fn() pour la clé, ou attend l'appel identique déjà en vol (TimeoutError
+        s'il n'est pas terminé dans les timeout secondes).
+        """
+        owned, pending = self.claim([key])
+        if not owned:
+            return pending[key].wait(timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.resolve(key, error=e)
+            raise
+        self.resolve(key, result)
+        return result
+
+
+class LRUCache:
+    """
+    Cache borné par un poids total (weigh(valeur), 1 par entrée par défaut) : au-delà
+    de max_weight, les entrées les moins récemment lues sont évincées.
+    """
+
+    def __init__(self, max_weight, weigh=None):
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda value: 1)
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # clé -> (valeur, poids)
+        self.weight = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        poids = self._weigh(value)
+        with self._lock:
+            ancien = self._data.pop(key, None)
+            if ancien is not None:
+                self.weight -= ancien[1]
+            self._data[key] = (value, poids)
+            self.weight += poids
+            while self.weight > self.max_weight and len(self._data) > 1:
+                _, (_, p) = self._data.popitem(last=False)
+                self.weight -= p
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,23 @@
+# tests/test_cli.py
+import io
+import json
+
+from cli import read_csv_products, read_json_products
+
+
+def test_invalid_rule_becomes_an_error_product():
+    f = io.StringIO(
+        "product_id,underlying,dates,weight,mode\n"
+        "P1,AAPL,mensuel 15/01/2024,1,max\n"
+        "P2,AAPL,02/01/2024;05/01/2024,1,\n"
+    )
+    p1, p2 = read_csv_products(f, offline=True)
+    assert p1["sous_jacents"] == {} and "Règle invalide" in p1["erreur"]
+    assert p1["mode"] == "Cours le plus haut (max)"
+    assert "erreur" not in p2 and p2["sous_jacents"]["AAPL"]["dates"] == ["02/01/2024", "05/01/2024"]
+
+
+def test_unreadable_weight_becomes_an_error_product():
+    obj = {"id": "J1", "underlyings": [{"name": "AAPL", "dates": ["02/01/2024"], "weight": "x"}]}
+    (produit,) = read_json_products(io.StringIO(json.dumps(obj) + "\n"), offline=True)
+    assert produit["id"] == "J1" and produit["erreur"]
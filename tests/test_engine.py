@@ -0,0 +1,83 @@
+# tests/test_engine.py
+import numpy as np
+import pytest
+
+from engine import (MODE_MAX, MODE_MIN, MODE_MOYENNE, compute_basket, compute_baskets, observation_cube,
+                    spots_by_mode, weight_sweep, weighted_global)
+
+
+def panier(*sous_jacents):
+    """[(ticker, [prix ou None], pondération)] -> (sous_jacents, prix_panier)."""
+    infos = {t: {"input_name": t, "resolved_ticker": t, "dates": [f"0{i + 1}/01/2024" for i in range(len(v))],
+                 "pond": pond} for t, v, pond in sous_jacents}
+    return infos, {t: v for t, v, _ in sous_jacents}
+
+
+def test_missing_prices_are_ignored_in_every_mode():
+    sous_jacents, prix = panier(("AAPL", [100.0, None, 110.0], 1.0), ("MSFT", [200.0, 220.0], 3.0))
+    calcul = compute_basket(sous_jacents, prix, MODE_MOYENNE)
+    assert [r["Spot"] for r in calcul["resultats"]] == [105.0, 210.0]
+    assert calcul["resultats"][0]["Valeurs"] == "100.0, N/A, 110.0"
+    assert calcul["spot_global_par_mode"] == {
+        MODE_MOYENNE: (105 + 210 * 3) / 4, MODE_MAX: (110 + 220 * 3) / 4, MODE_MIN: (100 + 200 * 3) / 4,
+    }
+    assert calcul["spot_global"] == 183.75 and calcul["manquants"] == 0
+
+
+def test_underlying_without_any_price_is_left_out_of_the_global_spot():
+    sous_jacents, prix = panier(("XXX", [None, None], 2.0), ("AAPL", [50.0], 0.0))
+    calcul = compute_basket(sous_jacents, prix, MODE_MAX)
+    assert calcul["resultats"][0]["Spot"] == "N/A"
+    assert calcul["spot_global"] == 50.0
+    assert calcul["manquants"] == 1
+
+
+def test_no_price_at_all_gives_no_global_spot():
+    sous_jacents, prix = panier(("XXX", [None], 1.0), ("YYY", [None, None], 1.0))
+    calcul = compute_basket(sous_jacents, prix, MODE_MIN)
+    assert calcul["spot_global"] is None
+    assert calcul["spot_global_par_mode"] == dict.fromkeys((MODE_MOYENNE, MODE_MAX, MODE_MIN))
+    assert calcul["manquants"] == 2
+
+
+def test_zero_weights_mean_equal_weights():
+    sous_jacents, prix = panier(("A", [10.0], 0.0), ("B", [20.0], 0.0))
+    calcul = compute_basket(sous_jacents, prix, MODE_MOYENNE)
+    assert calcul["spot_global"] == 15.0
+    assert [r["Pondération"] for r in calcul["resultats"]] == [1.0, 1.0]
+
+
+def test_unknown_mode_falls_back_to_the_mean():
+    sous_jacents, prix = panier(("A", [10.0, 30.0], 1.0))
+    assert compute_basket(sous_jacents, prix, "inconnu")["spot_global"] == 20.0
+
+
+def test_baskets_of_different_sizes_are_padded_without_effect():
+    petit = panier(("A", [10.0], 1.0))
+    grand = panier(("B", [1.0, 2.0, 3.0], 1.0), ("C", [None, 5.0], 1.0))
+    sorties = compute_baskets([(*petit, MODE_MAX), (*grand, MODE_MIN)])
+    assert [s["spot_global"] for s in sorties] == [10.0, 3.0]
+    assert [s["manquants"] for s in sorties] == [0, 0]
+
+
+def test_observation_cube_layout():
+    cube, poids = observation_cube([[([1.0, None], 0.0)], [([2.0], 3.0), ([4.0, 5.0, 6.0], 1.0)]])
+    assert cube.shape == (2, 2, 3)
+    assert np.isnan(cube[0, 0, 1]) and np.isnan(cube[0, 1]).all()
+    assert poids.tolist() == [[1.0, 0.0], [3.0, 1.0]]
+
+
+def test_spots_and_weighted_global_on_arrays():
+    cube = np.array([[[1.0, 3.0], [np.nan, np.nan]]])
+    spots = spots_by_mode(cube)
+    assert spots[MODE_MOYENNE][0, 0] == 2.0 and np.isnan(spots[MODE_MOYENNE][0, 1])
+    assert weighted_global(spots[MODE_MAX], np.array([[1.0, 5.0]])).tolist() == [3.0]
+    assert np.isnan(weighted_global(np.array([[np.nan]]), np.array([[1.0]]))[0])
+
+
+def test_weight_sweep_gives_one_row_per_weight_vector():
+    spots = np.array([[105.0, 210.0], [10.0, np.nan]])
+    table = weight_sweep(spots, [[1, 3], [0, 0], [2, 1]])
+    assert table.shape == (3, 2)
+    assert table[:, 0].tolist() == pytest.approx([183.75, 157.5, 140.0])
+    assert table[:, 1].tolist() == [10.0, 10.0, 10.0]
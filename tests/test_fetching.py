@@ -0,0 +1,119 @@
+# tests/test_fetching.py
+import threading
+import time
+
+import pandas as pd
+
+from fetching import fetch_concurrently
+from providers import PriceFetchError, PriceProvider
+
+DATES = ["03/01/2024", "10/01/2024"]
+
+
+class BatchStub(PriceProvider):
+    """Close constant par ticker ; échoue pour toute demande contenant un ticker de `bad`."""
+
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_closes(self, tickers, start, end):
+        tickers = [t.upper() for t in tickers]
+        with self._lock:
+            self.calls.append(sorted(tickers))
+        if self.bad & set(tickers):
+            raise PriceFetchError("réseau indisponible")
+        days = pd.bdate_range(start, end, inclusive="left")
+        return {t: pd.Series(float(len(t)), index=days) for t in tickers}
+
+
+def test_basket_is_fetched_in_one_call():
+    amont = BatchStub()
+    demandes = {f"T{i}": DATES for i in range(10)}
+    prix, _, echecs = fetch_concurrently(demandes, amont, backoff=0)
+    assert echecs == []
+    assert len(amont.calls) == 1
+    assert list(prix) == list(demandes)
+    assert prix["T3"] == [2.0, 2.0]
+
+
+def test_independent_batches_share_the_pool():
+    amont = BatchStub()
+    demandes = {f"T{i}": DATES for i in range(120)}
+    prix, _, _ = fetch_concurrently(demandes, amont, batch_size=50, backoff=0)
+    assert sorted(len(c) for c in amont.calls) == [20, 50, 50]
+    assert all(v == [float(len(t))] * 2 for t, v in prix.items())
+
+
+def test_failed_batch_is_split_per_ticker():
+    amont = BatchStub(bad={"BAD"})
+    termines = []
+    prix, _, echecs = fetch_concurrently({"AAPL": DATES, "BAD": DATES, "MSFT": DATES}, amont,
+                                         on_done=lambda t, n, total: termines.append((t, n, total)),
+                                         retries=2, backoff=0)
+    assert prix == {"AAPL": [4.0, 4.0], "BAD": [None, None], "MSFT": [4.0, 4.0]}
+    assert echecs == ["BAD"]
+    # 2 tentatives du lot, puis chaque ticker seul (2 tentatives pour BAD)
+    assert amont.calls.count(["AAPL", "BAD", "MSFT"]) == 2
+    assert amont.calls.count(["BAD"]) == 2
+    assert sorted(t for t, _, _ in termines) == ["AAPL", "BAD", "MSFT"]
+    assert termines[-1][1:] == (3, 3)
+
+
+class Flaky(PriceProvider):
+    """Lève `erreur` aux `echecs` premiers appels, puis répond normalement."""
+
+    def __init__(self, erreur, echecs=1):
+        self.erreur = erreur
+        self.echecs = echecs
+        self.calls = 0
+
+    def get_closes(self, tickers, start, end):
+        self.calls += 1
+        if self.calls <= self.echecs:
+            raise self.erreur
+        return BatchStub().get_closes(tickers, start, end)
+
+
+def test_transport_errors_are_retried():
+    amont = Flaky(PriceFetchError("réseau"))
+    prix, _, echecs = fetch_concurrently({"AAPL": DATES}, amont, backoff=0)
+    assert (prix, echecs) == ({"AAPL": [4.0, 4.0]}, [])
+    assert amont.calls == 2
+
+
+def test_other_errors_are_not_retried():
+    amont = Flaky(ValueError("réponse illisible"))
+    prix, _, echecs = fetch_concurrently({"AAPL": DATES}, amont, backoff=0)
+    assert (prix, echecs) == ({"AAPL": [None, None]}, ["AAPL"])
+    assert amont.calls == 1
+
+
+def test_no_data_is_final():
+    amont = BatchStub()
+    amont.get_closes = lambda tickers, start, end: amont.calls.append(tickers) or {}
+    # Pas de données : résultat définitif, pas un échec
+    prix, retenues, echecs = fetch_concurrently({"NOPE": DATES}, amont, backoff=0)
+    assert (prix, retenues, echecs) == ({"NOPE": [None, None]}, {"NOPE": [None, None]}, [])
+    assert len(amont.calls) == 1
+
+
+def test_stuck_batch_is_abandoned_after_its_timeout(monkeypatch):
+    import fetching
+    monkeypatch.setattr(fetching, "MARGE_TIMEOUT", 0.1)
+    libere = threading.Event()
+
+    class Bloque(PriceProvider):
+        def get_closes(self, tickers, start, end):
+            libere.wait(5)
+            return {}
+
+    debut = time.monotonic()
+    try:
+        prix, _, echecs = fetch_concurrently({"AAPL": DATES}, Bloque(), timeout=0.1)
+    finally:
+        libere.set()
+    assert prix == {"AAPL": [None, None]}
+    assert echecs == ["AAPL"]
+    assert time.monotonic() - debut < 2
@@ -0,0 +1,185 @@
+# tests/test_fx.py
+import time
+
+import pandas as pd
+import pytest
+
+from engine import build_product, price_products
+from providers import PriceFetchError, PriceProvider
+from singleflight import LRUCache
+
+SERIES = {
+    # Pas de cotation le lundi 08/01 : le Close retenu est celui du vendredi 05/01
+    "BNP.PA": pd.Series([50.0], index=pd.DatetimeIndex(["2024-01-05"])),
+    "EURUSD=X": pd.Series([1.10, 1.20], index=pd.DatetimeIndex(["2024-01-05", "2024-01-08"])),
+}
+
+
+class SeriesStub(PriceProvider):
+    def get_closes(self, tickers, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return {t.upper(): s[(s.index >= start) & (s.index < end)]
+                for t in tickers if (s := SERIES.get(t.upper())) is not None}
+
+
+def test_fx_rate_is_taken_on_the_matched_close_date():
+    produit = build_product("P1", [("BNP.PA", ["08/01/2024"], 1.0)], offline=True)
+    ((_, calcul),) = price_products([produit], SeriesStub(), currency="USD", offline=True)
+    assert calcul["spot_global"] == 50.0 * 1.10
+
+
+def test_price_lookup_returns_matched_close_dates():
+    from fetching import fetch_concurrently
+    prix, retenues, _ = fetch_concurrently({"BNP.PA": ["08/01/2024", "20/01/2024"]}, SeriesStub())
+    assert prix == {"BNP.PA": [50.0, None]}
+    assert retenues == {"BNP.PA": [pd.Timestamp("2024-01-05"), None]}
+
+
+class CurrencyStub(SeriesStub):
+    """Fournisseur de cours dont le cache persistant connaît déjà certaines devises."""
+
+    def __init__(self, devises):
+        self.devises = dict(devises)
+        self.stored = {}
+
+    def get_currencies(self, tickers):
+        return {t: self.devises[t] for t in tickers if t in self.devises}
+
+    def store_currencies(self, devises):
+        self.stored.update(devises)
+
+
+@pytest.fixture
+def reseau(monkeypatch):
+    """Remplace la requête yfinance de devise ; la mémoire du processus est vidée."""
+    import tickers
+    appels = []
+
+    def fetch(key):
+        appels.append(key)
+        devise = {"SAP.DE": "EUR"}.get(key)
+        tickers._currency.put(key, (devise, time.monotonic() + 60))
+        return devise
+
+    monkeypatch.setattr(tickers, "_currency", LRUCache(100))
+    monkeypatch.setattr(tickers, "_fetch_currency", fetch)
+    return appels
+
+
+def test_persisted_currencies_skip_the_network(reseau):
+    from fx import quote_currencies
+    provider = CurrencyStub({"VOD.L": "GBp"})
+    assert quote_currencies(["VOD.L", "SAP.DE"], provider) == {"VOD.L": "GBp", "SAP.DE": "EUR"}
+    assert reseau == ["SAP.DE"]
+    assert provider.stored == {"SAP.DE": "EUR"}
+
+
+def test_offline_currency_falls_back_to_suffix(reseau):
+    from fx import quote_currencies
+    assert quote_currencies(["BNP.PA"], CurrencyStub({}), offline=True) == {"BNP.PA": "EUR"}
+    assert reseau == []
+
+
+def test_slow_currency_lookup_falls_back_to_suffix(reseau, monkeypatch):
+    import threading
+
+    import fx
+    import tickers
+    libere = threading.Event()
+    monkeypatch.setattr(fx, "TIMEOUT_DEVISES", 0.1)
+    monkeypatch.setattr(tickers, "_fetch_currency", lambda key: libere.wait(5) and None)
+    debut = time.monotonic()
+    try:
+        assert fx.quote_currencies(["BNP.PA"], CurrencyStub({})) == {"BNP.PA": "EUR"}
+    finally:
+        libere.set()
+    assert time.monotonic() - debut < 2
+
+
+def test_currency_lookup_gives_up_when_the_rate_limiter_is_saturated(monkeypatch):
+    import providers
+    import tickers
+    monkeypatch.setattr(tickers, "_currency", LRUCache(100))
+    monkeypatch.setattr(providers.RATE_LIMITER, "acquire", lambda timeout=None: False)
+    assert tickers.ticker_currency("VOD.L") == "GBp"
+    # Pas de réponse : rien n'est mémoïsé, la devise sera redemandée
+    assert tickers.cached_currency("VOD.L") == (False, None)
+
+def test_observations_show_local_price_and_applied_rate(reseau):
+    from export import observations_frame
+    from fx import convert_prices
+    produit = build_product("P1", [("BNP.PA", ["08/01/2024"], 1.0)], offline=True)
+    locaux = {"BNP.PA": [50.0]}
+    convertis, devises, taux = convert_prices(locaux, {"BNP.PA": [pd.Timestamp("2024-01-05")]}, "USD",
+                                              SeriesStub(), offline=True)
+    ligne = observations_frame(produit["sous_jacents"], convertis, locaux, devises, taux).iloc[0]
+    assert (ligne["Prix"], ligne["Prix local"], ligne["Devise locale"], ligne["Taux de change"]) == (
+        50.0 * 1.10, 50.0, "EUR", 1.10)
+
+
+@pytest.fixture
+def fx_frais(monkeypatch):
+    """Module fx sans paire inverse apprise, retries sans attente."""
+    import fetching
+    import fx
+    monkeypatch.setattr(fx, "_inverses", LRUCache(10))
+    monkeypatch.setattr(fetching.call_with_retry, "__defaults__",
+                        (fetching.MAX_TENTATIVES, 0, fetching.TIMEOUT_SOUS_JACENT))
+    return fx
+
+
+class FxDown(SeriesStub):
+    """Cours des actions disponibles, paires de change en erreur réseau."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_closes(self, tickers, start, end):
+        if any(t.endswith("=X") for t in tickers):
+            self.calls += 1
+            raise PriceFetchError("réseau indisponible")
+        return super().get_closes(tickers, start, end)
+
+
+def test_fx_network_error_marks_the_products_in_error(fx_frais):
+    import fetching
+    amont = FxDown()
+    produit = build_product("P1", [("BNP.PA", ["08/01/2024"], 1.0), ("AAPL", ["08/01/2024"], 1.0)],
+                            offline=True)
+    ((produit, calcul),) = price_products([produit], amont, currency="USD", offline=True, backoff=0)
+    assert "Cours de change indisponibles" in produit["erreur"]
+    assert calcul["spot_global"] is None
+    assert amont.calls == fetching.MAX_TENTATIVES
+
+
+class InverseOnly(PriceProvider):
+    """Ne cote que USDEUR=X, pas EURUSD=X ; down : toute demande échoue."""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.calls = []
+
+    def get_closes(self, tickers, start, end):
+        self.calls.append(sorted(t.upper() for t in tickers))
+        if self.down:
+            raise PriceFetchError("réseau indisponible")
+        serie = pd.Series([0.8], index=pd.DatetimeIndex(["2024-01-05"]))
+        return {"USDEUR=X": serie} if "USDEUR=X" in self.calls[-1] else {}
+
+
+DEBUT, FIN = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-10")
+
+
+def test_unquoted_direct_pair_is_learned_as_inverse(fx_frais):
+    amont = InverseOnly()
+    assert fx_frais.fx_rates({"EUR"}, "USD", DEBUT, FIN, amont)["EUR"].iloc[0] == 1.25
+    fx_frais.fx_rates({"EUR"}, "USD", DEBUT, FIN, amont)
+    assert amont.calls == [["EURUSD=X"], ["USDEUR=X"], ["USDEUR=X"]]
+
+
+def test_failed_direct_pair_is_not_learned_as_inverse(fx_frais):
+    with pytest.raises(PriceFetchError):
+        fx_frais.fx_rates({"EUR"}, "USD", DEBUT, FIN, InverseOnly(down=True))
+    amont = InverseOnly()
+    fx_frais.fx_rates({"EUR"}, "USD", DEBUT, FIN, amont)
+    assert amont.calls[0] == ["EURUSD=X"]
@@ -0,0 +1,221 @@
+# tests/test_providers.py
+"""Cache SQLite et stub fichier, sans réseau : un fournisseur amont factice compte les appels."""
+import random
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+
+from providers import (CachedProvider, FileProvider, PriceFetchError, PriceProvider, RateLimitedProvider,
+                       RateLimiter, closest_points, deadline)
+
+
+class StubProvider(PriceProvider):
+    """Close constant par ticker pour chaque jour ouvré ; enregistre chaque appel."""
+
+    def __init__(self, prices=None, fail=False):
+        self.prices = prices or {"AAPL": 100.0, "MSFT": 200.0}
+        self.fail = fail
+        self.calls = []
+
+    def get_closes(self, tickers, start, end):
+        self.calls.append(sorted(tickers))
+        if self.fail:
+            raise PriceFetchError("réseau indisponible")
+        days = pd.bdate_range(pd.Timestamp(start), pd.Timestamp(end), inclusive="left")
+        return {t: pd.Series(self.prices[t], index=days) for t in tickers if t in self.prices}
+
+
+def recent_range(days=5):
+    today = pd.Timestamp.today().normalize()
+    return today - pd.Timedelta(days=days), today
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+
+# ---------- CachedProvider ----------
+
+def test_second_call_is_served_from_cache(db):
+    amont = StubProvider()
+    cache = CachedProvider(amont, path=db)
+    premier = cache.get_closes(["AAPL", "msft"], "2024-01-01", "2024-01-15")
+    second = cache.get_closes(["AAPL", "MSFT"], "2024-01-02", "2024-01-10")
+    assert amont.calls == [["AAPL", "MSFT"]]
+    assert set(premier) == {"AAPL", "MSFT"}
+    assert second["AAPL"].index.min() >= pd.Timestamp("2024-01-02")
+    assert (second["MSFT"] == 200.0).all()
+
+
+def test_recent_days_expire_after_ttl(db):
+    amont = StubProvider()
+    cache = CachedProvider(amont, path=db, ttl=0.05, recent_days=7)
+    start, end = recent_range()
+    cache.get_closes(["AAPL"], start, end)
+    cache.get_closes(["AAPL"], start, end)
+    assert len(amont.calls) == 1
+    time.sleep(0.1)
+    cache.get_closes(["AAPL"], start, end)
+    assert len(amont.calls) == 2
+
+
+def test_past_days_never_expire(db):
+    amont = StubProvider()
+    cache = CachedProvider(amont, path=db, ttl=0, recent_days=7)
+    cache.get_closes(["AAPL"], "2024-01-01", "2024-01-15")
+    time.sleep(0.01)
+    cache.get_closes(["AAPL"], "2024-01-01", "2024-01-15")
+    assert len(amont.calls) == 1
+
+
+def test_least_recently_read_rows_are_evicted(db):
+    cache = CachedProvider(StubProvider(), path=db, max_rows=10)
+    cache.get_closes(["AAPL"], "2024-01-01", "2024-01-11")
+    time.sleep(0.01)
+    cache.get_closes(["MSFT"], "2024-01-01", "2024-01-11")
+    conn = sqlite3.connect(db)
+    try:
+        restants = dict(conn.execute("SELECT ticker, COUNT(*) FROM closes GROUP BY ticker"))
+    finally:
+        conn.close()
+    assert restants == {"MSFT": 10}
+
+
+def test_offline_answers_from_cache_only(db):
+    CachedProvider(StubProvider(), path=db).get_closes(["AAPL"], "2024-01-01", "2024-01-15")
+    amont = StubProvider(fail=True)
+    hors_ligne = CachedProvider(amont, path=db, offline=True)
+    series = hors_ligne.get_closes(["AAPL", "MSFT"], "2024-01-01", "2024-01-15")
+    assert amont.calls == []
+    assert list(series) == ["AAPL"]
+
+
+def test_stale_rows_are_served_when_upstream_fails(db):
+    start, end = recent_range()
+    CachedProvider(StubProvider(), path=db, ttl=0).get_closes(["AAPL"], start, end)
+    time.sleep(0.01)
+    amont = StubProvider(fail=True)
+    series = CachedProvider(amont, path=db, ttl=0).get_closes(["AAPL"], start, end)
+    assert len(amont.calls) == 1
+    assert (series["AAPL"] == 100.0).all()
+
+
+def test_upstream_error_propagates_for_never_cached_days(db):
+    CachedProvider(StubProvider(), path=db).get_closes(["AAPL"], "2024-01-01", "2024-01-15")
+    cache = CachedProvider(StubProvider(fail=True), path=db)
+    with pytest.raises(PriceFetchError):
+        cache.get_closes(["AAPL"], "2024-01-01", "2024-01-31")
+
+
+# ---------- FileProvider ----------
+
+def test_file_provider_filters_range_and_tickers(tmp_path):
+    chemin = tmp_path / "closes.csv"
+    chemin.write_text(
+        "date,ticker,close\n"
+        "2024-01-02,AAPL,185.6\n2024-01-03,AAPL,184.2\n2024-01-04,AAPL,181.9\n"
+        "2024-01-03,MSFT,370.6\n",
+        encoding="utf-8",
+    )
+    series = FileProvider(str(chemin)).get_closes(["aapl", "MSFT", "NVDA"], "2024-01-03", "2024-01-04")
+    assert set(series) == {"AAPL", "MSFT"}
+    assert series["AAPL"].to_dict() == {pd.Timestamp("2024-01-03"): 184.2}
+
+
+def test_file_provider_reads_json(tmp_path):
+    chemin = tmp_path / "closes.json"
+    chemin.write_text('{"AAPL": {"2024-01-02": 185.6, "2024-01-03": 184.2}}', encoding="utf-8")
+    series = FileProvider(str(chemin)).get_closes(["AAPL"], "2024-01-01", "2024-01-10")
+    assert list(series["AAPL"]) == [185.6, 184.2]
+
+
+def test_no_data_is_cached_negatively_until_negative_ttl(db):
+    amont = StubProvider()
+    cache = CachedProvider(amont, path=db, negative_ttl=0.05)
+    assert cache.get_closes(["NOPE"], "2024-01-01", "2024-01-15") == {}
+    assert cache.get_closes(["NOPE"], "2024-01-01", "2024-01-15") == {}
+    assert len(amont.calls) == 1
+    time.sleep(0.1)
+    cache.get_closes(["NOPE"], "2024-01-01", "2024-01-15")
+    assert len(amont.calls) == 2
+
+
+# ---------- Limiteur de débit et échéances ----------
+
+def test_rate_limiter_gives_up_after_timeout():
+    limiteur = RateLimiter(rate=1.0, burst=1)
+    assert limiteur.acquire(timeout=0)
+    debut = time.monotonic()
+    assert not limiteur.acquire(timeout=0.1)
+    assert time.monotonic() - debut < 0.5
+
+
+def test_rate_limited_provider_honours_deadline():
+    limiteur = RateLimiter(rate=0.5, burst=1)
+    limiteur.acquire()
+    amont = StubProvider()
+    with deadline(0.1), pytest.raises(PriceFetchError):
+        RateLimitedProvider(amont, limiteur).get_closes(["AAPL"], "2024-01-01", "2024-01-05")
+    assert amont.calls == []
+
+
+def test_currencies_round_trip_through_sqlite(db):
+    CachedProvider(StubProvider(), path=db).store_currencies({"vod.l": "GBp"})
+    cache = CachedProvider(StubProvider(), path=db)
+    assert cache.get_currencies(["VOD.L", "SAP.DE"]) == {"VOD.L": "GBp"}
+    expire = CachedProvider(StubProvider(), path=db, currency_ttl=0)
+    time.sleep(0.01)
+    assert expire.get_currencies(["VOD.L"]) == {}
+    assert CachedProvider(StubProvider(), path=db, currency_ttl=0, offline=True).get_currencies(["VOD.L"]) == {
+        "VOD.L": "GBp"}
+
+
+
+# ---------- Close le plus proche ----------
+
+def closes(*jours):
+    return pd.Series([float(i + 1) for i in range(len(jours))], index=pd.DatetimeIndex(jours))
+
+
+def reference_closest(series, date):
+    """Ancienne règle, date par date : fenêtre [date - 4j, date + 4j[, la date antérieure l'emporte."""
+    fenetre = series[(series.index >= date - pd.Timedelta(days=4)) & (series.index < date + pd.Timedelta(days=4))]
+    if fenetre.empty:
+        return None, None
+    ecarts = abs(fenetre.index - date)
+    i = min(range(len(fenetre)), key=lambda k: (ecarts[k], fenetre.index[k]))
+    return float(fenetre.iloc[i]), fenetre.index[i]
+
+
+def test_equidistant_closes_keep_the_earlier_one():
+    # Férié le 03/01 : Close les 02/01 et 04/01, à un jour chacun
+    prix, retenues = closest_points(closes("2024-01-02", "2024-01-04"), [pd.Timestamp("2024-01-03")])
+    assert (prix, retenues) == ([1.0], [pd.Timestamp("2024-01-02")])
+
+
+def test_window_includes_d_minus_4_and_excludes_d_plus_4():
+    d = pd.Timestamp("2024-01-10")
+    assert closest_points(closes("2024-01-06"), [d]) == ([1.0], [pd.Timestamp("2024-01-06")])
+    assert closest_points(closes("2024-01-14"), [d]) == ([None], [None])
+    assert closest_points(closes("2024-01-05", "2024-01-14"), [d]) == ([None], [None])
+    assert closest_points(closes("2024-01-06", "2024-01-14"), [d]) == ([1.0], [pd.Timestamp("2024-01-06")])
+
+
+def test_missing_dates_and_empty_series():
+    d = pd.Timestamp("2024-01-10")
+    assert closest_points(closes("2024-01-10"), [None, d]) == ([None, 1.0], [None, d])
+    assert closest_points(pd.Series(dtype=float), [d]) == ([None], [None])
+
+
+def test_closest_points_matches_the_per_date_rule():
+    rng = random.Random(0)
+    base = pd.Timestamp("2024-01-01")
+    for _ in range(200):
+        jours = sorted(rng.sample(range(60), rng.randint(1, 20)))
+        serie = closes(*(base + pd.Timedelta(days=j) for j in jours))
+        dates = [base + pd.Timedelta(days=rng.randint(-6, 66)) for _ in range(10)]
+        prix, retenues = closest_points(serie, dates)
+        assert list(zip(prix, retenues)) == [reference_closest(serie, d) for d in dates]
@@ -0,0 +1,120 @@
+# tests/test_schedule.py
+import pandas as pd
+import pytest
+
+from schedule import exchange_for_ticker, expand_dates, generate_schedule, trading_calendar
+
+
+def jours(*dates):
+    return pd.DatetimeIndex(pd.to_datetime(list(dates), dayfirst=True))
+
+
+def ouvre(exchange, date):
+    return bool(trading_calendar(exchange).is_trading_day([pd.Timestamp(date).to_datetime64()])[0])
+
+
+# ---------- Conventions de décalage ----------
+
+@pytest.mark.parametrize("convention, attendue", [
+    # Samedi 31/08/2024 : le lundi suivant est en septembre
+    ("suivant", "02/09/2024"),
+    ("suivant-modifie", "30/08/2024"),
+    ("precedent", "30/08/2024"),
+    ("aucun", "31/08/2024"),
+])
+def test_saturday_month_end_shift(convention, attendue):
+    assert generate_schedule("2024-08-31", "2024-08-31", "mensuel", convention).equals(jours(attendue))
+
+
+def test_modified_preceding_stays_in_the_month():
+    # Samedi 01/06/2024 : le vendredi précédent est en mai
+    assert generate_schedule("2024-06-01", "2024-06-01", "mensuel", "precedent-modifie").equals(
+        jours("03/06/2024"))
+
+
+def test_default_convention_is_modified_following():
+    assert generate_schedule("2024-08-31", "2024-08-31", "mensuel").equals(jours("30/08/2024"))
+
+
+# ---------- Fréquences ----------
+
+def test_monthly_series_clamps_to_month_end_without_drift():
+    dates = generate_schedule("2024-01-31", "2024-05-31", "mensuel", "aucun")
+    assert dates.equals(jours("31/01/2024", "29/02/2024", "31/03/2024", "30/04/2024", "31/05/2024"))
+
+
+def test_quarterly_series_stops_at_the_end_date():
+    dates = generate_schedule("2024-01-15", "2024-12-14", "trimestriel", "aucun")
+    assert dates.equals(jours("15/01/2024", "15/04/2024", "15/07/2024", "15/10/2024"))
+
+
+def test_month_end_series_on_euronext():
+    # 31/03/2024 dimanche ; 01/04 (lundi de Pâques) fermé, le 02/04 est en avril, et
+    # le 29/03 (Vendredi saint) est fermé : retour au jeudi 28/03
+    dates = generate_schedule("2024-01-01", "2024-03-31", "fin-de-mois", exchange="XPAR")
+    assert dates.equals(jours("31/01/2024", "29/02/2024", "28/03/2024"))
+
+
+def test_daily_series_skips_holidays():
+    dates = generate_schedule("2024-03-28", "2024-04-03", "quotidien", exchange="XPAR")
+    assert dates.equals(jours("28/03/2024", "02/04/2024", "03/04/2024"))
+
+
+# ---------- Jours fériés par place ----------
+
+def test_good_friday_and_easter_monday_are_closed_on_euronext():
+    assert not ouvre("XPAR", "2024-03-29")
+    assert not ouvre("XPAR", "2024-04-01")
+    assert ouvre("XPAR", "2024-03-28")
+
+
+def test_lse_boxing_day_on_a_monday_moves_to_tuesday():
+    # Noël 2022 un dimanche (reporté au lundi 26) : Boxing Day passe au mardi 27
+    assert not ouvre("XLON", "2022-12-26")
+    assert not ouvre("XLON", "2022-12-27")
+    assert ouvre("XLON", "2022-12-28")
+
+
+def test_xetra_closes_on_christmas_eve_but_euronext_does_not():
+    assert not ouvre("XETR", "2024-12-24")
+    assert ouvre("XPAR", "2024-12-24")
+
+
+def test_juneteenth_is_closed_on_nyse_from_2022():
+    assert ouvre("XNYS", "2021-06-18")
+    assert not ouvre("XNYS", "2024-06-19")
+
+
+@pytest.mark.parametrize("ticker, place", [
+    ("BNP.PA", "XPAR"), ("AAPL", "XNYS"), ("vod.l", "XLON"), ("^FTSE", "XLON"),
+    ("SAP.DE", "XETR"), ("RY.TO", "WEEKDAYS"), ("^N225", "WEEKDAYS"),
+])
+def test_exchange_for_ticker(ticker, place):
+    assert exchange_for_ticker(ticker) == place
+
+
+# ---------- Erreurs et lignes saisies ----------
+
+def test_dates_outside_the_calendar_index_raise():
+    with pytest.raises(ValueError, match="hors de l'index"):
+        generate_schedule("1975-01-01", "1975-03-01", "mensuel")
+
+
+@pytest.mark.parametrize("args", [
+    ("2024-01-01", "2024-03-01", "bimensuel"),
+    ("2024-03-01", "2024-01-01", "mensuel"),
+    ("2024-01-01", "2024-03-01", "mensuel", "au-plus-proche"),
+])
+def test_invalid_rules_raise(args):
+    with pytest.raises(ValueError):
+        generate_schedule(*args)
+
+
+def test_expand_dates_keeps_plain_dates_and_uses_the_ticker_exchange():
+    lignes = ["02/01/2024", "mensuel 29/03/2024 30/04/2024 suivant"]
+    assert expand_dates(lignes, "BNP.PA") == ["02/01/2024", "02/04/2024", "29/04/2024"]
+
+
+def test_malformed_rule_line_raises():
+    with pytest.raises(ValueError, match="Règle invalide"):
+        expand_dates(["mensuel 15/01/2024"], "AAPL")
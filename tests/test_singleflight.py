@@ -0,0 +1,176 @@
+# tests/test_singleflight.py
+"""SingleFlight, LRUCache et SharedPriceStore : regroupement des appels concurrents et éviction."""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from providers import PriceFetchError, PriceProvider, SharedPriceStore
+from singleflight import LRUCache, SingleFlight
+
+
+# ---------- SingleFlight ----------
+
+def test_concurrent_callers_share_the_leader_result():
+    flight = SingleFlight("test")
+    depart, appels = threading.Event(), []
+
+    def travail():
+        appels.append(1)
+        depart.wait(2)
+        return 42
+
+    resultats = []
+    threads = [threading.Thread(target=lambda: resultats.append(flight.do("k", travail))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    depart.set()
+    for t in threads:
+        t.join()
+    assert appels == [1]
+    assert resultats == [42] * 5
+
+
+def test_leader_error_is_raised_in_waiters():
+    flight = SingleFlight("test")
+    owned, _ = flight.claim(["k"])
+    _, pending = flight.claim(["k"])
+    assert owned == ["k"] and list(pending) == ["k"]
+    flight.resolve("k", error=ValueError("boom"))
+    with pytest.raises(ValueError, match="boom"):
+        pending["k"].wait()
+    # La clé est libérée : l'appel suivant repart en leader
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_waiter_gives_up_after_timeout():
+    flight = SingleFlight("test")
+    flight.claim(["k"])
+    _, pending = flight.claim(["k"])
+    with pytest.raises(TimeoutError):
+        pending["k"].wait(timeout=0.05)
+
+
+# ---------- LRUCache ----------
+
+def test_lru_evicts_least_recently_read_by_weight():
+    cache = LRUCache(10, weigh=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    assert cache.get("a") == "xxxx"  # « b » devient le moins récemment lu
+    cache.put("c", "xxxx")
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx" and cache.get("c") == "xxxx"
+    assert cache.weight == 8
+
+
+def test_lru_replacing_a_key_updates_its_weight():
+    cache = LRUCache(10, weigh=len)
+    cache.put("a", "xxxxxxxx")
+    cache.put("a", "xx")
+    cache.put("b", "xxxxxxxx")
+    assert len(cache) == 2 and cache.weight == 10
+
+
+def test_lru_keeps_an_entry_heavier_than_the_limit():
+    cache = LRUCache(3, weigh=len)
+    cache.put("a", "xxxxx")
+    assert cache.get("a") == "xxxxx"
+
+
+# ---------- SharedPriceStore ----------
+
+class CountingStub(PriceProvider):
+    """Close constant par jour ouvré ; enregistre (tickers, start, end) de chaque appel."""
+
+    def __init__(self, delai=0.0, erreur=None):
+        self.calls = []
+        self.delai = delai
+        self.erreur = erreur
+        self._lock = threading.Lock()
+
+    def get_closes(self, tickers, start, end):
+        with self._lock:
+            self.calls.append((sorted(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        time.sleep(self.delai)
+        if self.erreur:
+            raise self.erreur
+        days = pd.bdate_range(start, end, inclusive="left")
+        return {t: pd.Series(1.0, index=days) for t in tickers if t != "NOPE"}
+
+
+def test_sub_range_is_served_from_the_cached_superset():
+    amont = CountingStub()
+    store = SharedPriceStore(amont)
+    store.get_closes(["AAPL"], "2024-01-01", "2024-03-01")
+    s = store.get_closes(["aapl"], "2024-01-10", "2024-01-20")["AAPL"]
+    assert len(amont.calls) == 1
+    assert s.index.min() >= pd.Timestamp("2024-01-10") and s.index.max() < pd.Timestamp("2024-01-20")
+
+
+def test_miss_widens_the_cached_range():
+    amont = CountingStub()
+    store = SharedPriceStore(amont)
+    store.get_closes(["AAPL"], "2024-01-01", "2024-02-01")
+    store.get_closes(["AAPL"], "2024-03-01", "2024-04-01")
+    assert amont.calls[-1][1:] == (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-04-01"))
+    store.get_closes(["AAPL"], "2024-02-01", "2024-03-01")
+    assert len(amont.calls) == 2
+
+
+def test_no_data_ticker_is_remembered():
+    amont = CountingStub()
+    store = SharedPriceStore(amont)
+    assert store.get_closes(["NOPE"], "2020-01-01", "2020-02-01") == {}
+    assert store.get_closes(["NOPE"], "2020-01-05", "2020-01-10") == {}
+    assert len(amont.calls) == 1
+
+
+def test_concurrent_schedules_coalesce_on_the_ticker():
+    amont = CountingStub(delai=0.1)
+    store = SharedPriceStore(amont)
+    resultats = {}
+
+    def demande(nom, start, end):
+        resultats[nom] = store.get_closes(["AAPL"], start, end)
+
+    leader = threading.Thread(target=demande, args=("large", "2024-01-01", "2024-06-01"))
+    leader.start()
+    time.sleep(0.03)
+    suiveur = threading.Thread(target=demande, args=("inclus", "2024-02-01", "2024-03-01"))
+    suiveur.start()
+    leader.join()
+    suiveur.join()
+    assert len(amont.calls) == 1
+    assert resultats["inclus"]["AAPL"].index.min() >= pd.Timestamp("2024-02-01")
+
+
+def test_upstream_error_reaches_waiters_and_is_not_cached():
+    amont = CountingStub(delai=0.1, erreur=PriceFetchError("réseau"))
+    store = SharedPriceStore(amont)
+    erreurs = []
+
+    def demande():
+        try:
+            store.get_closes(["AAPL"], "2024-01-01", "2024-02-01")
+        except PriceFetchError as e:
+            erreurs.append(e)
+
+    threads = [threading.Thread(target=demande) for _ in range(3)]
+    for t in threads:
+        t.start()
+        time.sleep(0.01)
+    for t in threads:
+        t.join()
+    assert len(erreurs) == 3 and len(amont.calls) == 1
+    amont.erreur = None
+    assert "AAPL" in store.get_closes(["AAPL"], "2024-01-01", "2024-02-01")
+
+
+def test_memory_is_bounded_by_points():
+    store = SharedPriceStore(CountingStub(), max_points=60)
+    store.get_closes(["AAA"], "2024-01-01", "2024-03-01")
+    store.get_closes(["BBB"], "2024-01-01", "2024-03-01")
+    assert len(store._cache) == 1
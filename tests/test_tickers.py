@@ -0,0 +1,34 @@
+# tests/test_tickers.py
+import pytest
+
+import tickers
+from engine import build_product
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    def refuse(ticker):
+        raise AssertionError(f"appel réseau inattendu pour {ticker}")
+    monkeypatch.setattr(tickers, "is_valid_ticker", refuse)
+
+
+def test_offline_accepts_raw_ticker_without_validation(no_network):
+    assert tickers.resolve_ticker_from_name("xyzq.pa", offline=True) == "XYZQ.PA"
+    assert tickers.resolve_ticker_from_name("Apple", offline=True) == "AAPL"
+
+
+def test_offline_build_product_makes_no_network_call(no_network):
+    produit = build_product("P1", [("zzzz", ["02/01/2024"], 1.0)], offline=True)
+    assert list(produit["sous_jacents"]) == ["ZZZZ"]
+
+
+def test_validation_waits_for_the_rate_limiter(monkeypatch):
+    import providers
+    from singleflight import LRUCache
+    demandes = []
+    monkeypatch.setattr(tickers, "_validity", LRUCache(100))
+    monkeypatch.setattr(providers.RATE_LIMITER, "acquire", lambda timeout=None: demandes.append(timeout) or False)
+    # Limiteur saturé : pas de requête .info, résultat non mémoïsé
+    assert tickers.is_valid_ticker("XYZQ.PA") is False
+    assert demandes == [tickers.TIMEOUT_INFO]
+    assert tickers._validity.get("XYZQ.PA") is None
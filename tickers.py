@@ -0,0 +1,384 @@
+# tickers.py
+"""
+Résolution des noms de compagnies en tickers Yahoo Finance : table des noms courants,
+index normalisé construit une seule fois à l'import, suggestions pour l'autocomplétion,
+vérification mémoïsée (avec TTL) des tickers inconnus et devise de cotation.
+"""
+import bisect
+import difflib
+import functools
+import re
+import time
+import unicodedata
+
+from metrics import METRICS
+from singleflight import LRUCache, SingleFlight
+
+# --- Mappage Direct des noms courants (Liste Blanche) ---
+COMMON_TICKERS = {
+        "APPLE": "AAPL", "MICROSOFT": "MSFT", "GOOGLE": "GOOGL", "ALPHABET": "GOOGL",
+        "AMAZON": "AMZN","META": "META","BERKSHIRE HATHAWAY": "BRK-A","JOHNSON & JOHNSON": "JNJ",
+        "JPMORGAN CHASE": "JPM", "EXXON MOBIL": "XOM", "COCA-COLA": "KO",
+        "WALMART": "WMT", "DISNEY": "DIS", "LVMH": "LVMH.PA", "LOREAL": "OR.PA",
+        "TOTALENERGIES": "TTE", "SANTE": "SAN.PA", "BNP PARIBAS": "BNP.PA",
+        "BNP": "BNP.PA", "SOCIETE GENERALE": "GLE.PA", "HERMES": "RMS.PA",
+        "AIRBUS": "AIR.PA", "AXA": "CS.PA", "SAP": "SAP.DE", "SIEMENS": "SIE.DE",
+        "BAYER": "BAYN.DE", "SAMSUNG": "005930.KS", "TSMC": "TSM","TOYOTA": "TM",
+        "JPMORGAN CHASE": "JPM","BANK OF AMERICA": "BAC",
+        "WELLS FARGO & CO": "WFC","GOLDMAN SACHS": "GS","MORGAN STANLEY": "MS",
+        "CITIGROUP INC": "C","CITIGROUP": "C","CITI" : "C","BNP PARIBAS": "BNP.PA",
+        "CREDIT AGRICOLE": "ACA.PA","DEUTSCHE BANK AG": "DBK.DE","COMMERZBANK AG": "CBK.DE",
+        "UBS GROUP AG": "UBSG.SW","UBS GROUP" : "UBSG.SW","UBS": "UBSG.SW",
+        "STANDARD CHARTERED": "STAN.L","BARCLAYS PLC": "BARC.L","LLOYDS BANKING GROUP": "LLOY.L",
+        "NATWEST GROUP": "NWG.L","ROYAL BANK OF CANADA": "RY","TORONTO-DOMINION BANK": "TD",
+        "SOCIETE GENERALE": "GLE.PA","HSBC": "HSBA.L",
+  # --- BANQUES RÉGIONALES ET SPÉCIALISÉES (US & EU) ---
+        "PNC FINANCIAL SERV": "PNC","US BANCORP": "USB","CAPITAL ONE FINANCIAL": "COF",
+        "ZIONS BANCORP": "ZION","COMERICA INC": "CMA","HUNTINGTON BANCSHARES": "HBAN",
+        "REGIONS FINANCIAL CORP": "RF","FIFTH THIRD BANCORP": "FITB","KEYCORP": "KEY",
+        "EAST WEST BANCORP": "EWBC","ING GROEP NV": "INGA.AS","KBC GROUP NV": "KBC.BR",
+        "BANCO SANTANDER": "SAN","UNICREDIT SPA": "UCG.MI",
+        "INTESA SANPAOLO": "ISP.MI","BANCO DE SABADELL": "SAB.MC","CAIXABANK SA": "CABK.MC",
+        "MEDIOBANCA SPA": "MB.MI","NORDEA BANK ABP": "NDA-DK.CO",
+        "DANSKE BANK A/S": "DANSKE.CO","SWEDBANK AB": "SWED A.ST","SEB AB": "SEB A.ST",
+ # --- ASSURANCES (VIE, NON-VIE, RÉASSURANCE) ---
+        "CHUBB LTD": "CB","AIG": "AIG","METLIFE INC": "MET","PRUDENTIAL FINANCIAL": "PRU",
+        "UNUM GROUP": "UNM","TRUIST FINANCIAL CORP": "TFC","ALLIANZ SE": "ALV.DE",
+        "MUNICH RE": "MUV2.DE","HANNOVER RE": "HNR1.DE","ZURICH INSURANCE GR": "ZURN.SW",
+        "GENERALI ASSICURAZIONI": "G.MI","AVIVA PLC": "AV.L","LEGAL & GENERAL GR": "LGEN.L",
+        "PRUDENTIAL PLC (UK)": "PRU.L","MANULIFE FINANCIAL": "MFC","SUN LIFE FINANCIAL": "SLF",
+        "AXA SA": "CS.PA",
+ # --- GESTION D'ACTIFS ET MARCHÉS DE CAPITAUX ---
+       "BLACKROCK INC": "BLK","VANGUARD": "VTI","STATE STREET CORP": "STT","CME GROUP": "CME",
+       "BANK OF NEW YORK MELLON": "BK","NORTHERN TRUST CORP": "NTRS","CME GROUP": "CME",
+       "INTERCONTINENTAL EXC": "ICE","CBOE GLOBAL MARKETS": "CBOE","NASDAQ INC": "NDAQ",
+       "LSE GROUP PLC": "LSEG.L","DEUTSCHE BOERSE AG": "DB1.DE","EURONEXT NV": "ENX.PA",
+       "HONG KONG EXCHANGES": "0388.HK","S&P GLOBAL INC": "SPGI","MOODY'S CORP": "MCO",
+       "FACTSET RESEARCH": "FDS",
+ # --- FINTECH ET PAIEMENTS ---
+       "VISA INC": "V","MASTERCARD INC": "MA","AMERICAN EXPRESS": "AXP", "FIS GLOBAL": "FIS",
+       "PAYPAL HOLDINGS": "PYPL","SQUARE (BLOCK INC)": "SQ","COINBASE GLOBAL": "COIN",
+       "ADYEN NV": "ADYEN.AS","GLOBAL PAYMENTS INC": "GPN","FISERV INC": "FISV",
+       "FIS GLOBAL": "FIS","DISCOVER FINANCIAL SERV": "DFS","SYNCHRONY FINANCIAL": "SYF",
+       "AFFIRM HOLDINGS": "AFRM","SOFI TECHNOLOGIES": "SOFI","ROBINHOOD MARKETS": "HOOD",
+       "WISE PLC": "WISE.L","PAGSEGURO DIGITAL": "PAGS","STONECO LTD": "STNE", 
+# -- BANQUES ASIATIQUES ET ÉMERGENTES --
+       "MITSUBISHI UFJ FIN": "8306.T","SUMITOMO MITSUI FIN": "8316.T","MIZUHO FINANCIAL GR": "8411.T",
+       "NOMURA HOLDINGS": "8604.T","HDFC BANK": "HDFCBANK.NS","ICICI BANK": "ICICIBANK.NS",
+       "AXIS BANK": "AXISBANK.NS","STATE BANK OF INDIA": "SBIN.NS","BANK OF CHINA": "3988.HK",
+       "CHINA CONSTRUCTION BK": "0939.HK","ICBC": "1398.HK","WESTPAC BANKING CORP": "WBC.AX",
+       "ANZ GROUP HOLDINGS": "ANZ.AX","COMMONWEALTH BANK AUS": "CBA.AX","MACQUARIE GROUP": "MQG.AX",
+       "DBS GROUP HOLDINGS": "DBSM.SI","OVERSEAS CHINESE BK": "OCBC.SI",
+# -- BOITES IA ET TECH --
+       "ARISTANETWORKS": "ANET","ACLARARES": "ACLA","ALPHA&OMEGASEMI": "AOSL","MONOLITHICPOWERSYS": "MPWR",
+       "QORVOINC": "QRVO","LUMINARTECH": "LAZR","AMD": "AMD","GLOBO": "GLBE","AXCELISTECHNOLOGIES": "ACLS",
+       "NOVARTUS": "NVTS","SILICONLABS": "SLAB","HIMAXTECHNOLOGIES": "HIMX","INPHICORPORATION": "IPHI",
+       "ONSEMICONDUCTOR": "ON","MACOMTECHNOLOGY": "MTSI","MKSINSTRUMENTS": "MKSI","ULVAC": "6728.T",
+       "OKTAINC": "OKTA","DATADOG": "DDOG","COUPASOFTWARE": "COUP","C3AI": "AI","UPSTARTHOLDINGS": "UPST",
+       "VEEVASYSTEMS": "VEEV","ZENDESK": "ZEN","NEWRELIC": "NEWR","MULESOFT": "MULE","ASANA": "ASAN",
+       "PALANTIRTECHNOLOGIES": "PLTR","DRAFTKINGS": "DKNG","CROWDSTRIKEHOLDINGS": "CRWD","ZSCALER": "ZS",
+       "FORTINET": "FTNT","CHECKPOINTSOFTWARE": "CHKP","CYBERARKSOFTWARE": "CYBR","PROOFPOINT": "PFPT",
+       "OKTA": "OKTA","ACTEURSASIATIQUES&EUROPÉENS": "","NORDICSEMICONDUCTOR": "NOD.OL","IMEC": "IMEC.BR",
+       "ACCELERATED": "ACEL","INFINEONTECHNOLOGIES": "IFX.DE","STMICROELECTRONICS": "STM","JD.COM": "JD",
+       "ASMLHOLDING": "ASML","MEITUAN": "3690.HK","JD.COM": "JD","BAIDUINC": "BIDU","NETEASEINC": "NTES",
+       "SKHYNIX": "000660.KS","KINGSOFTCLOUD": "KC","SONYGROUPCORP": "SONY","CANONINC": "CAJ","REDHAT": "IBM",
+       "ARCELIKAS": "ARCLK.IS","INVITAECORP": "NVTA","TAIYOYUDENCO": "6976.T","TOKYOELECTRONLTD": "8035.T",
+       "SCREENHOLDINGSCO": "7735.T","BESEMICONDUCTOR": "BESI.AS","EVOTECSE": "EVT.DE","BIONTECHSE": "BNTX",
+       "TELADOCHEALTH": "TDOC","MAXLINEARINC": "MXL","WIX.COMLTD": "WIX","RINGCENTRAL": "RNG",
+       "PAYCOMSOFTWARE": "PAYC","DOCUSIGNINC": "DOCU","TERADATACORP": "TDC","DATTOHOLDINGCORP": "DATTO",
+       "CHECKPOINTSOFT": "CHKP","PALOALTONETWORKS": "PANW","ASANAINC": "ASAN","FASTLYINC": "FSLY",
+       "LATTICESEMICON": "LSCC","DURATIONMEDIA": "DUR","ROHMCOLTD": "6963.T","DISCOCORP": "6146.T",
+       "PHOTRONLTD": "6899.T","AMS-OSRAMAG": "AMS.SW","SARTORIUSSTEDIM": "DIM.PA","CUREVACNV": "CVAC",
+       "ACCELERATEDIAGNOSTICS": "AXDX","SAGEGROUPPLC": "SGE.L","HUBSPOTINC": "HUBS","CLOUDERA": "CLDR",
+       "FIVERRINTERNATIONAL": "FVRR","AUTOMATICDATAPROC": "ADP","HEWLETTPACKARDENT": "HPE",
+       "COUPASOFTWARE": "COUP","DXCTECHNOLOGY": "DXC","CYBERARKSOFTWARE": "CYBR","ZSCALERINC": "ZS",
+       "C3.AIINC": "AI","CORTICELLIB": "CORB","CREEINC": "CREE","AMBARELLAINC": "AMBA","SUMCOCORP": "3436.T",
+       "LASERTECCORP": "6920.T","ASMINTERNATIONAL": "ASM.AS","AIXTRONSE": "AIXA.DE","GENMABAS": "GMAB.CO",
+       "VAXARTINC": "VXRT","INSIGHTENTERPRISES": "NSIT","AVEVAGROUPPLC": "AVV.L","ZILLOWGROUP": "Z",
+       "OKTAINC": "OKTA","UPWORKINC": "UPWK","SALESFORCEINC": "CRM","DELLTECHNOLOGIES": "DELL",
+       "PAGERDUTYINC": "PD","MICROFOCUSINTL": "MCRO.L","FORTINETINC": "FTNT","VEEVASYSTEMS": "VEEV",
+       "ATOSSE": "ATOS.PA","UPSTARTHOLDINGS": "UPST","SUMOLOGIC": "SUMO","SPLUNKINC": "SPLK",
+       "STMICROELECTRONICS": "SGMR.DU","INFINEON": "IFX.F",
+  #--- CAC60  ---            
+        "LVMH": "MC.PA","Hermes International": "RMS.PA",
+       "L'Oreal": "OR.PA","Airbus": "AIR.PA","Schneider Electric": "SU.PA","EssilorLuxottica": "EL.PA",
+       "Safran": "SAF.PA","TotalEnergies": "TTE.PA","Sanofi": "SAN.PA","Air Liquide": "AI.PA",
+       "Vinci": "DG.PA","Engie": "ENGI.PA","Danone": "BN.PA","Thales": "HO.PA","Saint-Gobain": "SGO.PA",
+       "Orange": "ORA.PA","Kering": "KER.PA","Legrand": "LR.PA","Dassault Systemes": "DSY.PA",
+       "ArcelorMittal": "MT.AS","Stellantis": "STLAM.MI","Capgemini": "CAP.PA","Publicis Groupe": "PUB.PA",
+       "Veolia Environnement": "VIE.PA","Dassault Aviation": "AM.PA","Sartorius Stedim Biotech": "DIM.PA",
+       "STMicroelectronics": "STM.PA","Michelin": "ML.PA","Pernod Ricard": "RI.PA","Bouygues": "EN.PA",
+       "Amundi": "AMUN.PA","Unibail-Rodamco-Westfield": "URW.PA","Aeroports de Paris": "ADP.PA",
+       "bioMerieux": "BIM.PA","Euronext": "ENX.PA","Eiffage": "FGR.PA","Bureau Veritas": "BVI.PA",
+       "Alstom": "ALO.PA","Accor": "AC.PA","Eurofins Scientific": "ERF.PA","Renault": "RNO.PA",
+       "Carrefour": "CA.PA","Rexel": "RXL.PA","Klepierre": "LI.PA","Getlink": "GET.PA","SPIE": "SPIE.PA",
+       "Sodexo": "SW.PA","Gecina": "GFC.PA","Gaztransport & Technigaz": "GTT.PA","Technip Energies": "TE.PA",
+       "Nexans": "NEX.PA","Scor": "SCR.PA","Edenred": "EDEN.PA","Arkema": "AKE.PA",
+#--- FTSE100 ---
+       "AstraZeneca": "AZN.L","HSBC Holdings": "HSBA.L","Shell": "SHEL.L","Unilever": "ULVR.L",
+       "BP": "BP.L","GlaxoSmithKline": "GSK.L","British American Tobacco": "BATS.L","Rio Tinto": "RIO.L",
+       "Diageo": "DGE.L","RELX": "REL.L", "London Stock Exchange Group": "LSEG.L","Barclays": "BARC.L",
+       "Lloyds Banking Group": "LLOY.L","NatWest Group": "NWG.L","Standard Chartered": "STAN.L",
+       "Prudential": "PRU.L","Legal & General": "LGEN.L","Aviva": "AV.L","Schroders": "SDR.L",
+       "Experian": "EXPN.L","Reckitt Benckiser": "RKT.L","Compass Group": "CPG.L","Next": "NXT.L",
+        "Associated British Foods": "ABF.L","Ocado Group": "OCDO.L","Marks & Spencer": "MKS.L",
+        "Tesco": "TSCO.L","J Sainsbury": "SBRY.L","Kingfisher": "KGF.L","Persimmon": "PSN.L",
+        "Barratt Developments": "BDEV.L","Taylor Wimpey": "TW.L","Whitbread": "WTB.L",
+        "InterContinental Hotels Group": "IHG.L","Rolls-Royce Holdings": "RR.L","BAE Systems": "BA.L",
+        "Smiths Group": "SMIN.L","Halma": "HLMA.L","Spirax-Sarco Engineering": "SPX.L",
+        "Ashtead Group": "AHT.L","Croda International": "CRDA.L", "Fresnillo": "FRES.L",
+        "Anglo American": "AAL.L","Antofagasta": "ANTO.L","Glencore": "GLEN.L","Rentokil Initial": "RTO.L",
+        "Severn Trent": "SVT.L","United Utilities": "UU.L","National Grid": "NG.L",
+#--- DAX ---
+        "SAP": "SAP.DE","Siemens": "SIE.DE","Allianz": "ALV.DE","Deutsche Telekom": "DTE.DE",
+        "Mercedes-Benz Group": "MBG.DE","BMW": "BMW.DE","Volkswagen": "VOW3.DE",
+        "Porsche Automobil Holding": "PAH3.DE","Porsche AG": "P911.DE","BASF": "BAS.DE",
+        "Bayer": "BAYN.DE","Merck KGaA": "MRK.DE","Siemens Healthineers": "SHL.DE",
+        "Siemens Energy": "ENR.DE","Infineon Technologies": "IFX.DE","RWE": "RWE.DE",
+        "E.ON": "EOAN.DE","Heidelberg Materials": "HEI.DE","MTU Aero Engines": "MTX.DE",
+        "Deutsche Post DHL": "DHL.DE","Deutsche Boerse": "DB1.DE","Munich Re": "MUV2.DE",
+        "Hannover Re": "HNR1.DE","Commerzbank": "CBK.DE","Deutsche Bank": "DBK.DE",
+        "Fresenius": "FRE.DE","Fresenius Medical Care": "FME.DE","Beiersdorf": "BEI.DE",
+        "Henkel": "HEN3.DE","Continental": "CON.DE","Covestro": "1COV.DE","Symrise": "SY1.DE",
+        "Puma": "PUM.DE","Zalando": "ZAL.DE","Delivery Hero": "DHER.DE","Qiagen": "QIA.DE",
+        "Sartorius": "SRT3.DE","Vonovia": "VNA.DE","Brenntag": "BNR.DE",
+        
+        "Apple": "AAPL","Microsoft": "MSFT","Alphabet": "GOOGL","Amazon": "AMZN","Nvidia": "NVDA",
+        "Tesla": "TSLA","Meta Platforms": "META","Berkshire Hathaway": "BRK-A","Johnson & Johnson": "JNJ",
+        "UnitedHealth Group": "UNH","Pfizer": "PFE","Merck & Co": "MRK","AbbVie": "ABBV","Eli Lilly": "LLY",
+        "Amgen": "AMGN","Exxon Mobil": "XOM","Chevron": "CVX","ConocoPhillips": "COP","Coca-Cola": "KO",
+        "PepsiCo": "PEP","Procter & Gamble": "PG","Walmart": "WMT","Costco": "COST","McDonalds": "MCD",
+        "Nike": "NKE","Home Depot": "HD","Disney": "DIS","JPMorgan Chase": "JPM","Bank of America": "BAC",
+        "Wells Fargo": "WFC","Goldman Sachs": "GS","Morgan Stanley": "MS","Citigroup": "C","Charles Schwab": "SCHW",
+        "Ally Financial": "ALLY","BlackRock": "BLK","State Street": "STT","BNY Mellon": "BK","Northern Trust": "NTRS",
+        "Visa": "V","Mastercard": "MA","American Express": "AXP","PayPal": "PYPL","Block": "SQ","Coinbase": "COIN",
+        "Adobe": "ADBE","Oracle": "ORCL","Salesforce": "CRM","ServiceNow": "NOW","Workday": "WDAY","Intuit": "INTU",
+        "Snowflake": "SNOW","ASML Holding": "ASML","Samsung Electronics": "005930.KS","SK Hynix": "000660.KS",
+        "AMD": "AMD","Applied Materials": "AMAT","Lam Research": "LRCX","KLA": "KLAC","Infineon Technologies": "IFX.DE",
+        "STMicroelectronics": "STM.PA","Tencent Holdings": "0700.HK","Alibaba Group": "BABA","JD.com": "JD",
+        "Meituan": "3690.HK","Baidu": "BIDU","NetEase": "NTES","Sony Group": "SONY","Nintendo": "7974.T",
+        "SoftBank Group": "9984.T","Keyence": "6861.T","Hitachi": "6501.T","Fanuc": "6954.T",
+        "Recruit Holdings": "6098.T","Toyota Motor": "TM","Nestle": "NESN.SW","Roche Holding": "ROG.SW",
+        "Novartis": "NOVN.SW","Zurich Insurance Group": "ZURN.SW","Swiss Re": "SREN.SW","UBS Group": "UBSG.SW",
+        "Schneider Electric": "SU.PA","Vinci": "DG.PA", "SAP": "SAP.DE","Siemens": "SIE.DE","Allianz": "ALV.DE",
+        "Deutsche Telekom": "DTE.DE","BMW": "BMW.DE","Mercedes-Benz Group": "MBG.DE","Volkswagen": "VOW3.DE",
+        "BASF": "BAS.DE","Bayer": "BAYN.DE","Munich Re": "MUV2.DE","HSBC Holdings": "HSBA.L",
+        "Shell": "SHEL.L","BP": "BP.L","Unilever": "ULVR.L","Rio Tinto": "RIO.L","Diageo": "DGE.L",
+        "London Stock Exchange Group": "LSEG.L"
+}
+
+VALIDITY_TTL = 24 * 3600  # secondes, pour un ticker reconnu
+NEGATIVE_TTL = 3600       # secondes, pour un ticker rejeté (ou une erreur réseau)
+VALIDITY_MAX_ENTRIES = 4096
+CURRENCY_TTL = 7 * 24 * 3600  # secondes, pour une devise obtenue de yfinance
+TIMEOUT_INFO = 10  # secondes d'attente maximale du limiteur de débit ou d'un appel .info en vol
+
+# Devise déduite du suffixe Yahoo, quand elle ne peut pas être demandée (hors-ligne,
+# erreur réseau). Les valeurs de Londres sont cotées en pence (GBp).
+SUFFIX_CURRENCIES = {
+    "": "USD", "PA": "EUR", "AS": "EUR", "BR": "EUR", "LS": "EUR", "MI": "EUR", "MC": "EUR",
+    "DE": "EUR", "F": "EUR", "L": "GBp", "SW": "CHF", "T": "JPY", "KS": "KRW", "HK": "HKD",
+    "TO": "CAD", "AX": "AUD",
+}
+
+
+def normalize_name(name):
+    """Forme canonique d'un nom : sans accents, en majuscules, sans ponctuation ni espaces."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return re.sub(r"[^A-Z0-9]", "", name.upper())
+
+
+def _build_index():
+    """
+    Construit une fois pour toutes les tables de recherche à partir de COMMON_TICKERS :
+    clés exactes (en majuscules), index normalisé et nom affiché par clé normalisée.
+    Les clés déjà en majuscules restent prioritaires dans l'index : ce sont celles que
+    trouvait la recherche exacte historique.
+    """
+    exact = {k: v for k, v in COMMON_TICKERS.items() if k == k.upper() and v}
+    index, display = {}, {}
+    for key, ticker in COMMON_TICKERS.items():
+        if not ticker:
+            continue
+        norm = normalize_name(key)
+        index[norm] = ticker
+        if norm not in display or (display[norm].isupper() and not key.isupper()):
+            display[norm] = key
+    for key, ticker in exact.items():
+        index[normalize_name(key)] = ticker
+    return exact, index, display
+
+
+_EXACT, _INDEX, _DISPLAY = _build_index()
+_SORTED_KEYS = sorted(_INDEX)
+
+# Communs à toutes les sessions : {TICKER: (valide, expiration monotonic)}, et une
+# seule vérification réseau en vol par ticker
+_validity = LRUCache(VALIDITY_MAX_ENTRIES)
+_validity_flight = SingleFlight("validity")
+_currency = LRUCache(VALIDITY_MAX_ENTRIES)  # {TICKER: (devise, expiration monotonic)}
+_currency_flight = SingleFlight("currency")
+
+
+def _check_ticker(ticker):
+    """
+    Interroge yfinance (appel réseau lent), au débit commun, pour savoir si le ticker
+    existe. None si le limiteur de débit ne libère pas la requête dans TIMEOUT_INFO.
+    """
+    import yfinance as yf  # Import différé : inutile si le nom est dans l'index
+    from providers import RATE_LIMITER  # Import différé (pandas)
+    if not RATE_LIMITER.acquire(timeout=TIMEOUT_INFO):
+        return None
+    METRICS.inc("spot_network_requests_total", source="yf_info")
+    try:
+        with METRICS.timer("spot_ticker_validation_seconds"):
+            info = yf.Ticker(ticker).info
+        if info.get("currency"):
+            _currency.put(ticker.upper(), (info["currency"], time.monotonic() + CURRENCY_TTL))
+        if 'longName' in info and len(info.get('longName', '')) > 2:
+            return True
+        return False
+    except Exception:
+        return False
+
+
+def _validate(key):
+    valid = _check_ticker(key)
+    if valid is None:
+        return False  # Pas de réponse : non mémoïsé, le ticker sera revérifié
+    _validity.put(key, (valid, time.monotonic() + (VALIDITY_TTL if valid else NEGATIVE_TTL)))
+    return valid
+
+
+def is_valid_ticker(ticker):
+    """
+    Vérifie rapidement si un ticker est reconnu par yfinance. Le résultat, positif ou
+    négatif, est mémoïsé (VALIDITY_TTL / NEGATIVE_TTL) pour éviter les appels .info répétés ;
+    les sessions qui vérifient le même ticker en même temps attendent le même appel,
+    au plus TIMEOUT_INFO (False au-delà, sans mémoïsation).
+    """
+    if not ticker: return False
+    key = ticker.upper()
+    cached = _validity.get(key)
+    if cached and cached[1] > time.monotonic():
+        METRICS.inc("spot_validity_cache_total", result="hit")
+        return cached[0]
+    METRICS.inc("spot_validity_cache_total", result="miss")
+    try:
+        return _validity_flight.do(key, lambda: _validate(key), timeout=TIMEOUT_INFO)
+    except TimeoutError:
+        return False
+
+
+def _suffix_currency(ticker):
+    """Devise déduite du suffixe (None pour un indice ou un suffixe inconnu)."""
+    if ticker.startswith("^"):
+        return None
+    return SUFFIX_CURRENCIES.get(ticker.rsplit(".", 1)[1] if "." in ticker else "")
+
+
+def _fetch_currency(key):
+    """
+    Devise confirmée par yfinance (None si inconnue ou en cas d'échec), au débit commun.
+    Si le limiteur de débit ne libère pas la requête dans TIMEOUT_INFO, None n'est pas
+    mémoïsé : la devise sera redemandée au prochain appel.
+    """
+    import yfinance as yf  # Import différé
+    from providers import RATE_LIMITER  # Import différé (pandas)
+    if not RATE_LIMITER.acquire(timeout=TIMEOUT_INFO):
+        return None
+    METRICS.inc("spot_network_requests_total", source="yf_info")
+    try:
+        devise = yf.Ticker(key).info.get("currency")
+    except Exception:
+        devise = None
+    _currency.put(key, (devise, time.monotonic() + (CURRENCY_TTL if devise else NEGATIVE_TTL)))
+    return devise
+
+
+def remember_currency(ticker, devise):
+    """Mémoïse une devise confirmée obtenue ailleurs (ex. cache persistant du fournisseur)."""
+    _currency.put(ticker.strip().upper(), (devise, time.monotonic() + CURRENCY_TTL))
+
+
+def cached_currency(ticker):
+    """(True, devise confirmée ou None) si le processus la connaît encore, sinon (False, None)."""
+    cached = _currency.get(ticker.strip().upper())
+    if cached and cached[1] > time.monotonic():
+        return True, cached[0]
+    return False, None
+
+
+def confirmed_currency(ticker, offline=False):
+    """
+    Devise de cotation confirmée par yfinance (code Yahoo, ex. « EUR », « GBp »),
+    demandée une seule fois puis mémoïsée pour tout le processus (CURRENCY_TTL) ; None
+    si elle est inconnue, ou hors-ligne si elle n'a pas encore été obtenue. L'attente
+    d'une demande déjà en vol est bornée à TIMEOUT_INFO (None au-delà).
+    """
+    if not ticker: return None
+    key = ticker.strip().upper()
+    connue, devise = cached_currency(key)
+    if connue:
+        METRICS.inc("spot_currency_cache_total", result="hit")
+        return devise
+    if offline:
+        return None
+    METRICS.inc("spot_currency_cache_total", result="miss")
+    try:
+        return _currency_flight.do(key, lambda: _fetch_currency(key), timeout=TIMEOUT_INFO)
+    except TimeoutError:
+        return None
+
+
+def ticker_currency(ticker, offline=False):
+    """
+    Devise de cotation du ticker : confirmée par yfinance (confirmed_currency) ou, à
+    défaut (hors-ligne, échec), déduite du suffixe ; None si elle reste inconnue.
+    """
+    if not ticker: return None
+    return confirmed_currency(ticker, offline) or _suffix_currency(ticker.strip().upper())
+
+
+def resolve_ticker_from_name(name_or_ticker, offline=False):
+    """
+    Tente de trouver le ticker Yahoo Finance en utilisant d'abord un mappage 
+    pour les noms courants, puis la vérification directe (pour les tickers inconnus).
+    En mode offline, aucune vérification réseau : une entrée ayant la forme d'un ticker
+    est acceptée telle quelle.
+    """
+    clean_input = name_or_ticker.strip().upper()
+
+    # 1. Mappage direct : clé exacte, puis forme normalisée (casse, accents, ponctuation)
+    ticker = _EXACT.get(clean_input) or _INDEX.get(normalize_name(clean_input))
+    if ticker:
+        return ticker
+
+    # 2. Vérification si l'entrée est un Ticker non mappé
+    if len(clean_input) <= 10 and (' ' not in clean_input):
+        if offline or is_valid_ticker(clean_input):
+            return clean_input
+            
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def suggest_tickers(text, limit=8):
+    """
+    Suggestions ((nom, ticker), ...) pour l'autocomplétion : noms commençant par le texte
+    saisi (recherche dichotomique dans l'index trié), complétées par des noms approchants.
+    """
+    norm = normalize_name(text)
+    if not norm:
+        return ()
+    found = []
+    i = bisect.bisect_left(_SORTED_KEYS, norm)
+    while i < len(_SORTED_KEYS) and _SORTED_KEYS[i].startswith(norm) and len(found) < limit:
+        found.append(_SORTED_KEYS[i])
+        i += 1
+    if len(found) < limit:
+        for key in difflib.get_close_matches(norm, _SORTED_KEYS, n=limit, cutoff=0.75):
+            if key not in found:
+                found.append(key)
+    return tuple((_DISPLAY[k], _INDEX[k]) for k in found[:limit])